@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 from data_agent.base_agent import BaseAgent, BaseAgentConfig
 from data_agent.mcp_tools.mcp_client import MCPClient
 from data_agent.mcp_tools.mcp_config import MCPConfigManager, MCPServerConfig, ServerType
+from data_agent.prompts.prompt_manager import PromptManager
 # from data_agent.utils.observability import ObservabilityManager
 from data_agent.utils.observability_disabled import ObservabilityManager
 import json
@@ -19,8 +20,8 @@ class AgentConfig(BaseAgentConfig):
 class DataAnalysisAgent(BaseAgent):
     """数据分析Agent"""
     
-    def __init__(self, config: AgentConfig):
-        super().__init__(config)
+    def __init__(self, config: AgentConfig, prompt_manager: Optional[PromptManager] = None):
+        super().__init__(config, prompt_manager)
         # 更新特定的MCP服务器URL
         config_manager = MCPConfigManager()
         default_servers = config_manager.create_default_servers()
@@ -114,15 +115,17 @@ class DataAnalysisAgent(BaseAgent):
         # 调用LLM解析查询
         parsed_result = await self._call_llm(parse_prompt, context)
         
-        # 记录原始LLM输出用于调试
-        self.debug_manager.log_llm_output(f"原始LLM输出: {parsed_result}")
+        # 记录原始LLM输出用于调试（未启用调试时跳过格式化）
+        if self.debug_manager.enabled:
+            self.debug_manager.log_llm_output(f"原始LLM输出: {parsed_result}")
         
         # 确保返回的是字典
         if not isinstance(parsed_result, dict):
             logger.warning(f"LLM返回的不是字典格式: {type(parsed_result)}")
             parsed_result = {"intent": user_input, "mcp_tools": []}
         
-        self.debug_manager.log_llm_output(json.dumps(parsed_result, ensure_ascii=False, indent=2))
+        if self.debug_manager.enabled:
+            self.debug_manager.log_llm_output(json.dumps(parsed_result, ensure_ascii=False, indent=2))
         
         # 处理时间参数
         parsed_result = await self._handle_date_parameters(parsed_result)
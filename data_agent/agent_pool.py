@@ -0,0 +1,61 @@
+"""
+Agent对象池
+复用已初始化的Agent，避免每个查询重复创建MCP客户端和LLM管理器
+"""
+
+import asyncio
+import contextlib
+from typing import Any, AsyncIterator, List, Optional, Type
+
+from data_agent.agent import DataAnalysisAgent
+from data_agent.base_agent import BaseAgentConfig
+from data_agent.prompts.prompt_manager import PromptManager
+
+
+class AgentPool:
+    """Agent对象池，池大小即同时处理的查询数上限"""
+
+    def __init__(self, config: BaseAgentConfig, size: int = 1,
+                 agent_cls: Type = DataAnalysisAgent,
+                 prompt_manager: Optional[PromptManager] = None):
+        if size <= 0:
+            raise ValueError("size必须为正整数")
+        self.config = config
+        self.size = size
+        self.agent_cls = agent_cls
+        self.prompt_manager = prompt_manager
+        self.agents: List[Any] = []
+        self._idle: Optional[asyncio.Queue] = None
+
+    async def __aenter__(self):
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            agent = self.agent_cls(self.config, prompt_manager=self.prompt_manager)
+            self.agents.append(agent)
+            self._idle.put_nowait(agent)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await asyncio.gather(*(agent.aclose() for agent in self.agents), return_exceptions=True)
+        self.agents.clear()
+        self._idle = None
+
+    async def acquire(self):
+        """取出一个空闲Agent，没有空闲Agent时等待"""
+        if self._idle is None:
+            raise RuntimeError("AgentPool未启动，请使用 async with AgentPool(...)")
+        return await self._idle.get()
+
+    def release(self, agent):
+        """归还Agent并清空其调试日志，保留已初始化的MCP/LLM管理器"""
+        agent.debug_manager.clear_logs()
+        self._idle.put_nowait(agent)
+
+    @contextlib.asynccontextmanager
+    async def agent(self) -> AsyncIterator[Any]:
+        """在一次查询期间持有一个Agent"""
+        agent = await self.acquire()
+        try:
+            yield agent
+        finally:
+            self.release(agent)
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 from data_agent.mcp_tools.mcp_client import MCPClient
 from data_agent.mcp_tools.mcp_config import MCPConfigManager, MCPServerConfig, ServerType
 from data_agent.utils.debug import DebugManager
-from data_agent.prompts.prompt_manager import PromptManager
+from data_agent.prompts.prompt_manager import PromptManager, get_default_prompt_manager
 from data_agent.llm.llm_manager import LLMManager
 from data_agent.utils.observability_disabled import ObservabilityManager
 from data_agent.utils.security import SecurityManager
@@ -26,12 +26,13 @@ class BaseAgentConfig(BaseModel):
     langfuse_enabled: bool = False
     default_llm: str = "qwen"
     mcp_config: Optional[Dict[str, Any]] = None
+    debug_max_logs: Optional[int] = None
 
 
 class BaseAgent:
     """基础Agent类，封装通用功能"""
     
-    def __init__(self, config: BaseAgentConfig):
+    def __init__(self, config: BaseAgentConfig, prompt_manager: Optional[PromptManager] = None):
         self.config = config
         # 构建MCP配置
         if config.mcp_config:
@@ -44,8 +45,13 @@ class BaseAgent:
             # 子类应该更新特定的URL
             
         self.mcp_client = MCPClient(mcp_config)
-        self.debug_manager = DebugManager(enabled=config.debug_mode, langfuse_enabled=config.langfuse_enabled)
-        self.prompt_manager = PromptManager()
+        self.debug_manager = DebugManager(
+            enabled=config.debug_mode,
+            langfuse_enabled=config.langfuse_enabled,
+            max_logs=config.debug_max_logs
+        )
+        # 未指定时共享进程级默认PromptManager
+        self.prompt_manager = prompt_manager or get_default_prompt_manager()
         self.llm_manager = LLMManager(default_model=config.default_llm)
         self.observability = ObservabilityManager()
         self.security = SecurityManager()
@@ -60,6 +66,10 @@ class BaseAgent:
         """处理用户查询（带安全检查）- 子类应重写此方法"""
         raise NotImplementedError("子类必须实现process_query方法")
     
+    async def aclose(self):
+        """释放Agent资源：发送完排队中的Langfuse事件并关闭其线程池，应在事件循环结束前调用"""
+        await self.debug_manager.aclose()
+    
     async def _handle_date_parameters(self, parsed_query: Dict[str, Any]) -> Dict[str, Any]:
         """处理日期参数，如将'最近'转换为具体日期"""
         # 确保parsed_query是字典
@@ -14,6 +14,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from data_agent.agent import DataAnalysisAgent, AgentConfig
 from data_agent.mcp_tools.mcp_client import MCPClient
+from data_agent.utils.text import truncate
 
 async def check_system_status():
     """检查系统状态"""
@@ -133,7 +134,7 @@ async def check_mcp_connectivity():
                     # 尝试获取服务器说明
                     instructions = server_info.get('instructions', '')
                     if instructions:
-                        print(f"    说明: {instructions[:50]}{'...' if len(instructions) > 50 else ''}")
+                        print(f"    说明: {truncate(instructions, 50)}")
                 
     except Exception as e:
         print(f"✗ MCP服务连通性检查失败: {e}")
@@ -92,6 +92,8 @@ class AgentCLI:
         except Exception as e:
             print(f"错误: {e}", file=sys.stderr)
             sys.exit(1)
+        finally:
+            await agent.aclose()
 
 def main():
     """主函数"""
@@ -5,14 +5,11 @@
 """
 
 import asyncio
-import logging
 from data_agent.agent import DataAnalysisAgent, AgentConfig
+from data_agent.utils.log_config import DETAILED_FORMAT, setup_logging
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging(fmt=DETAILED_FORMAT)
 
 async def demo_complex_analysis():
     """演示复杂数据分析"""
@@ -47,9 +44,9 @@ async def demo_complex_analysis():
         
         # 显示调试信息摘要
         print("\n调试信息:")
-        llm_inputs = [log for log in agent.debug_manager.logs if log['type'] == 'llm_input']
-        llm_outputs = [log for log in agent.debug_manager.logs if log['type'] == 'llm_output']
-        mcp_calls = [log for log in agent.debug_manager.logs if log['type'] == 'mcp_input']
+        llm_inputs = agent.debug_manager.get_by_type('llm_input')
+        llm_outputs = agent.debug_manager.get_by_type('llm_output')
+        mcp_calls = agent.debug_manager.get_by_type('mcp_input')
         
         print(f"  - LLM调用: {len(llm_inputs)} 次")
         print(f"  - MCP调用: {len(mcp_calls)} 次")
@@ -82,7 +79,7 @@ async def demo_error_recovery():
     print(f"Agent回复:\n{result}")
     
     # 显示错误日志
-    error_logs = [log for log in agent.debug_manager.logs if log['type'] == 'error']
+    error_logs = agent.debug_manager.get_by_type('error')
     if error_logs:
         print("\n错误处理:")
         for log in error_logs:
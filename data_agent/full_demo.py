@@ -5,11 +5,11 @@
 """
 
 import asyncio
-import logging
 from data_agent.agent import DataAnalysisAgent, AgentConfig
+from data_agent.utils.log_config import setup_logging
 
 # 配置日志
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 
 async def main():
     """主函数 - 演示Agent的完整功能"""
@@ -5,14 +5,12 @@
 """
 
 import asyncio
-import logging
 from data_agent.agent import DataAnalysisAgent, AgentConfig
+from data_agent.utils.text import truncate
+from data_agent.utils.log_config import DETAILED_FORMAT, setup_logging
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging(fmt=DETAILED_FORMAT)
 
 async def main():
     """主函数"""
@@ -33,7 +31,14 @@ async def main():
         "比较一下我们两个产品线的 performance"
     ]
     
-    # 处理查询
+    # 处理查询，结束时关闭Agent
+    try:
+        await _run_queries(agent, queries)
+    finally:
+        await agent.aclose()
+
+async def _run_queries(agent: DataAnalysisAgent, queries):
+    """依次处理查询并显示调试信息"""
     for query in queries:
         print(f"\n{'='*50}")
         print(f"用户查询: {query}")
@@ -45,8 +50,8 @@ async def main():
         # 显示调试信息
         if agent.debug_manager.logs:
             print(f"\n调试信息 (最近3条):")
-            for log in agent.debug_manager.logs[-3:]:
-                print(f"  [{log['timestamp']}] {log['type']}: {str(log.get('tool_name', '')) or str(log.get('error', ''))[:50]}...")
+            for log in list(agent.debug_manager.logs)[-3:]:
+                print(f"  [{log['timestamp']}] {log['type']}: {truncate(str(log.get('tool_name') or log.get('error', '')), 50)}")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
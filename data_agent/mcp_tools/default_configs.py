@@ -0,0 +1,45 @@
+"""
+默认MCP服务器配置
+供测试脚本和命令行工具共用
+"""
+
+import os
+from typing import Any, Dict, Tuple
+
+# 默认MCP服务器，headers在 build_mcp_config() 调用时按环境变量生成
+DEFAULT_MCP_SERVERS: Dict[str, Dict[str, Any]] = {
+    "sec-fetch-production": {
+        "type": "sse",
+        "url": "http://localhost:8000/mcp",
+        "serverInstructions": "SEC财报数据分析服务，支持完整的13F和财务数据查询"
+    },
+    "sec-investment-analysis": {
+        "type": "sse",
+        "url": "http://localhost:8001/mcp",
+        "serverInstructions": "SEC投资分析服务，提供巴菲特风格的投资分析功能"
+    },
+    "sec-stock-query": {
+        "type": "sse",
+        "url": "http://localhost:8002/mcp",
+        "serverInstructions": "Alpha Vantage股票查询服务，提供实时股票数据和技术分析"
+    }
+}
+
+# 各服务器API密钥对应的环境变量及未设置时的占位值
+API_KEY_ENV: Dict[str, Tuple[str, str]] = {
+    "sec-fetch-production": ("MCP_API_KEY", "your-api-key-here"),
+    "sec-investment-analysis": ("MCP_INVESTMENT_API_KEY", "your-api-key-here"),
+    "sec-stock-query": ("ALPHA_VANTAGE_KEY", "your-alpha-vantage-key"),
+}
+
+
+def build_mcp_config(with_api_keys: bool = True) -> Dict[str, Any]:
+    """构建MCP客户端配置，API密钥在调用时从环境变量读取"""
+    mcp_servers = {}
+    for name, server in DEFAULT_MCP_SERVERS.items():
+        headers = {}
+        if with_api_keys and name in API_KEY_ENV:
+            env_key, placeholder = API_KEY_ENV[name]
+            headers["X-API-Key"] = os.getenv(env_key, placeholder)
+        mcp_servers[name] = {**server, "headers": headers}
+    return {"mcpServers": mcp_servers}
@@ -6,6 +6,7 @@ import aiohttp
 import json
 from dotenv import load_dotenv
 import os
+from data_agent.utils import json_utils
 
 # 加载环境变量
 load_dotenv()
@@ -15,19 +16,43 @@ logger = logging.getLogger(__name__)
 class MCPClient:
     """MCP客户端，用于调用各种MCP工具"""
     
+    # 连接池大小
+    MAX_CONNECTIONS = 100
+    MAX_CONNECTIONS_PER_HOST = 20
+    # 每个MCP服务器允许的最大并发调用数
+    MAX_CONCURRENT_CALLS_PER_SERVER = 8
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.session = None
         self.tools_cache = {}
         self.server_info = {}
+        # server_info每次变更时递增，供状态接口生成ETag
+        self.version = 0
+        self._server_limits: Dict[str, asyncio.Semaphore] = {}
+        self._session_users = 0
+        self._init_task = None
         
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
-        await self._initialize_servers()
+        # 并发查询共享同一个连接池，仅在首次进入时创建会话并检查服务器
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.MAX_CONNECTIONS,
+                limit_per_host=self.MAX_CONNECTIONS_PER_HOST,
+                ttl_dns_cache=300
+            )
+            self.session = aiohttp.ClientSession(connector=connector, json_serialize=json_utils.dumps)
+            self._server_limits = {}
+            self._init_task = asyncio.ensure_future(self._initialize_servers())
+        self._session_users += 1
+        # 其他并发进入者等待同一次服务器初始化完成
+        await asyncio.shield(self._init_task)
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        self._session_users -= 1
+        if self._session_users <= 0 and self.session:
+            self._session_users = 0
             await self.session.close()
             
     async def _initialize_servers(self):
@@ -39,31 +64,36 @@ class MCPClient:
                 
                 async with self.session.get(health_url) as response:
                     if response.status == 200:
-                        health_data = await response.json()
-                        self.server_info[server_name] = {
+                        health_data = await response.json(loads=json_utils.loads)
+                        self._set_server_info(server_name, {
                             "url": url,
                             "healthy": True,
                             "health_data": health_data,
                             "headers": server_config.get("headers", {}),
                             "instructions": server_config.get("serverInstructions", "")
-                        }
+                        })
                         logger.info(f"MCP服务器 {server_name} 健康检查通过")
                     else:
-                        self.server_info[server_name] = {
+                        self._set_server_info(server_name, {
                             "url": url,
                             "healthy": False,
                             "headers": server_config.get("headers", {}),
                             "instructions": server_config.get("serverInstructions", "")
-                        }
+                        })
                         logger.warning(f"MCP服务器 {server_name} 健康检查失败")
             except Exception as e:
                 logger.error(f"初始化MCP服务器 {server_name} 时出错: {e}")
-                self.server_info[server_name] = {
+                self._set_server_info(server_name, {
                     "url": server_config["url"],
                     "healthy": False,
                     "headers": server_config.get("headers", {}),
                     "instructions": server_config.get("serverInstructions", "")
-                }
+                })
+    
+    def _set_server_info(self, server_name: str, info: Dict[str, Any]):
+        """更新服务器信息并递增版本号"""
+        self.server_info[server_name] = info
+        self.version += 1
     
     def get_available_tools(self) -> List[str]:
         """获取可用的MCP工具列表"""
@@ -100,8 +130,9 @@ class MCPClient:
                 "timestamp": datetime.now().isoformat()
             }
             
-            # 发送请求
-            result = await self._send_request(url, payload, server_info["headers"])
+            # 发送请求（按服务器限制并发调用数）
+            async with self._get_server_limit(server_info["url"]):
+                result = await self._send_request(url, payload, server_info["headers"])
             
             # 缓存结果
             self.tools_cache[cache_key] = result
@@ -113,6 +144,14 @@ class MCPClient:
             # 尝试恢复机制
             return await self._recover_from_error(tool_name, parameters, e)
             
+    def _get_server_limit(self, server_url: str) -> asyncio.Semaphore:
+        """获取指定服务器的并发限制信号量"""
+        limit = self._server_limits.get(server_url)
+        if limit is None:
+            limit = asyncio.Semaphore(self.MAX_CONCURRENT_CALLS_PER_SERVER)
+            self._server_limits[server_url] = limit
+        return limit
+            
     def _get_tool_to_server_mapping(self) -> Dict[str, str]:
         """获取工具到服务器的映射"""
         # 使用固定的工具到服务器映射
@@ -166,7 +205,7 @@ class MCPClient:
             
             async with self.session.post(url, json=payload, headers=request_headers, timeout=30) as response:
                 if response.status == 200:
-                    result_data = await response.json()
+                    result_data = await response.json(loads=json_utils.loads)
                     return {
                         "status": "success",
                         "url": url,
@@ -29,24 +29,26 @@ class SubAgentManager:
     def create_sub_agent(self, name: str, config: Dict[str, Any], agent_type: AgentType = AgentType.DATA_ANALYSIS):
         """创建子Agent"""
         agent = None
+        # 子Agent与主Agent共享同一个PromptManager，避免重复加载默认prompt
+        prompt_manager = getattr(self.main_agent, "prompt_manager", None)
         if agent_type == AgentType.DATA_ANALYSIS:
             from data_agent.agent import AgentConfig, DataAnalysisAgent
             agent_config = AgentConfig(**config)
-            agent = DataAnalysisAgent(agent_config)
+            agent = DataAnalysisAgent(agent_config, prompt_manager=prompt_manager)
         elif agent_type == AgentType.DEMAND_NETWORK:
             from data_agent.demand_network_agent import DemandNetworkAgentConfig, DemandNetworkAnalysisAgent
             agent_config = DemandNetworkAgentConfig(**config)
-            agent = DemandNetworkAnalysisAgent(agent_config)
+            agent = DemandNetworkAnalysisAgent(agent_config, prompt_manager=prompt_manager)
         elif agent_type == AgentType.INVESTMENT:
             # 可以添加投资分析Agent
             from data_agent.agent import AgentConfig, DataAnalysisAgent
             agent_config = AgentConfig(**config)
-            agent = DataAnalysisAgent(agent_config)
+            agent = DataAnalysisAgent(agent_config, prompt_manager=prompt_manager)
         else:
             # 默认使用数据分析Agent
             from data_agent.agent import AgentConfig, DataAnalysisAgent
             agent_config = AgentConfig(**config)
-            agent = DataAnalysisAgent(agent_config)
+            agent = DataAnalysisAgent(agent_config, prompt_manager=prompt_manager)
             
         if agent:
             self.sub_agents[name] = agent
@@ -5,14 +5,12 @@
 """
 
 import asyncio
-import logging
 from data_agent.agent import DataAnalysisAgent, AgentConfig
+from data_agent.utils.text import truncate
+from data_agent.utils.log_config import DETAILED_FORMAT, setup_logging
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging(fmt=DETAILED_FORMAT)
 
 async def main():
     """主函数"""
@@ -61,23 +59,39 @@ async def main():
         "获取微软的实时股价和技术分析"
     ]
     
-    # 处理查询
-    for query in queries:
+    # 并发处理查询（各查询相互独立，总耗时约等于最慢的一个）
+    try:
+        results = await asyncio.gather(
+            *(run_query(agent, query) for query in queries),
+            return_exceptions=True
+        )
+    finally:
+        await agent.aclose()
+    
+    for query, outcome in zip(queries, results):
         print(f"\n{'='*50}")
         print(f"用户查询: {query}")
         print('='*50)
         
-        try:
-            result = await agent.process_query(query)
-            print(f"Agent回复:\n{result}")
-        except Exception as e:
-            print(f"处理查询时出错: {e}")
+        if isinstance(outcome, Exception):
+            print(f"处理查询时出错: {outcome}")
+            continue
+        
+        result, session_logs = outcome
+        print(f"Agent回复:\n{result}")
         
         # 显示调试信息
-        if agent.debug_manager.logs:
+        if session_logs:
             print(f"\n调试信息 (最近3条):")
-            for log in agent.debug_manager.logs[-3:]:
-                print(f"  [{log['timestamp']}] {log['type']}: {str(log.get('tool_name', '')) or str(log.get('error', ''))[:50]}...")
+            for log in session_logs[-3:]:
+                print(f"  [{log['timestamp']}] {log['type']}: {truncate(str(log.get('tool_name') or log.get('error', '')), 50)}")
+
+async def run_query(agent: DataAnalysisAgent, query: str):
+    """处理单个查询，并返回该查询所属调试会话的日志"""
+    result = await agent.process_query(query)
+    # 会话ID按任务隔离，这里读取到的就是本次查询的会话
+    session_logs = agent.debug_manager.get_logs(agent.debug_manager.current_session_id)
+    return result, session_logs
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,25 +1,49 @@
-import json
+import asyncio
 import logging
+import os
+import stat
+import tempfile
 from typing import Dict, Any, Optional
 from pathlib import Path
+from data_agent.utils import json_utils
 
 logger = logging.getLogger(__name__)
 
+def _file_mode_for(filepath: str) -> int:
+    """文件已存在时返回其权限位，否则返回按当前umask新建文件时的默认权限"""
+    try:
+        return stat.S_IMODE(os.stat(filepath).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
 class PromptManager:
     """Prompt管理器，用于管理各种prompt模板"""
     
+    __slots__ = ("prompts_dir", "prompts")
+    
+    # 默认prompt在进程内只构建一次，所有实例共享（只读）
+    _DEFAULTS: Dict[str, str] = {}
+    
     def __init__(self, prompts_dir: str = "prompts"):
         self.prompts_dir = Path(prompts_dir)
+        # 仅保存当前实例覆盖/新增的prompt，未覆盖的回落到共享默认值
         self.prompts = {}
         self._load_default_prompts()
         
     def _load_default_prompts(self):
-        """加载默认prompt"""
-        self.prompts = {
+        """加载默认prompt（类级别共享，只在首次实例化时构建）"""
+        if PromptManager._DEFAULTS:
+            return
+        PromptManager._DEFAULTS = {
             "query_parser": self._get_query_parser_prompt(),
             "response_generator": self._get_response_generator_prompt(),
             "data_analyzer": self._get_data_analyzer_prompt(),
             "reflection_analyzer": self._get_reflection_analyzer_prompt(),
+            "optimization_prompt": self._get_optimization_prompt(),
+            "long_thinking_prompt": self._get_long_thinking_prompt(),
+            "comparison_prompt": self._get_comparison_prompt(),
             "demand_network_query_parser": self._get_demand_network_query_parser_prompt(),
             "demand_network_response_generator": self._get_demand_network_response_generator_prompt()
         }
@@ -188,9 +212,69 @@ class PromptManager:
   "new_query": "如果需要深入分析，请提供新的查询"
 }"""
         
+    def _get_optimization_prompt(self) -> str:
+        """获取反思优化prompt"""
+        return """你是一个AI优化专家。请基于以下建议优化分析结果。
+
+原始查询: {original_query}
+当前结果: {current_result}
+优化建议: {suggestions}
+
+请提供优化后的结果，要求更加全面、准确和深入。"""
+        
+    def _get_long_thinking_prompt(self) -> str:
+        """获取长时间思考prompt"""
+        return """你有更多时间来深入分析这个问题。请进行更全面、更细致的思考。
+
+原始查询: {original_query}
+思考时间: {time_allocation}分钟
+
+请按照以下步骤进行深入分析:
+1. 问题分解：将复杂问题拆分为多个子问题
+2. 多角度分析：从不同维度审视问题
+3. 数据验证：检查数据的准确性和完整性
+4. 方案对比：比较不同解决方案的优劣
+5. 风险评估：识别潜在风险和应对措施
+
+请提供详细、深入的分析结果。"""
+        
+    def _get_comparison_prompt(self) -> str:
+        """获取方法比较prompt"""
+        return """你是一个AI分析专家。请比较不同方法的优劣。
+
+原始查询: {original_query}
+待比较方法: {approaches}
+
+请按照以下步骤进行分析:
+1. 分析每种方法的适用场景
+2. 比较每种方法的优缺点
+3. 评估每种方法的风险
+4. 给出推荐方案
+
+请严格按照以下JSON格式返回结果:
+{
+  "approach_analysis": [
+    {
+      "approach": "方法1",
+      "pros": ["优点1", "优点2"],
+      "cons": ["缺点1", "缺点2"],
+      "risk_assessment": "风险评估"
+    }
+  ],
+  "recommendation": "推荐方案",
+  "reasoning": "推荐理由"
+}"""
+        
     def get_prompt(self, prompt_name: str) -> str:
         """获取指定名称的prompt"""
-        return self.prompts.get(prompt_name, "")
+        prompt = self.prompts.get(prompt_name)
+        if prompt is None:
+            prompt = self._DEFAULTS.get(prompt_name, "")
+        return prompt
+        
+    def get_all_prompts(self) -> Dict[str, str]:
+        """获取所有prompt（默认值与当前实例覆盖合并后的结果）"""
+        return {**self._DEFAULTS, **self.prompts}
         
     def add_prompt(self, prompt_name: str, prompt_template: str):
         """添加新的prompt"""
@@ -198,7 +282,7 @@ class PromptManager:
         
     def update_prompt(self, prompt_name: str, prompt_template: str):
         """更新现有prompt"""
-        if prompt_name in self.prompts:
+        if prompt_name in self.prompts or prompt_name in self._DEFAULTS:
             self.prompts[prompt_name] = prompt_template
         else:
             raise ValueError(f"Prompt '{prompt_name}' 不存在")
@@ -206,21 +290,41 @@ class PromptManager:
     def load_prompts_from_file(self, filepath: str):
         """从文件加载prompts"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                prompts_data = json.load(f)
-                self.prompts.update(prompts_data)
+            with open(filepath, 'rb') as f:
+                prompts_data = json_utils.loads(f.read())
+            self.prompts.update(prompts_data)
             logger.info(f"从 {filepath} 加载了 {len(prompts_data)} 个prompts")
         except Exception as e:
             logger.error(f"加载prompts文件失败: {e}")
             
     def save_prompts_to_file(self, filepath: str):
-        """保存prompts到文件"""
+        """保存prompts到文件（先写临时文件再原子替换，避免并发写入损坏文件）"""
+        tmp_path = None
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(self.prompts, f, ensure_ascii=False, indent=2)
+            directory = os.path.dirname(os.path.abspath(filepath))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".prompts-", suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json_utils.dumps_bytes(self.get_all_prompts(), indent=True))
+            # mkstemp创建的临时文件权限为0600，替换前恢复为原文件（或正常新建文件）的权限
+            os.chmod(tmp_path, _file_mode_for(filepath))
+            os.replace(tmp_path, filepath)
+            tmp_path = None
             logger.info(f"Prompts已保存到 {filepath}")
         except Exception as e:
             logger.error(f"保存prompts文件失败: {e}")
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            
+    async def aload_prompts_from_file(self, filepath: str):
+        """异步从文件加载prompts，文件读取在线程池中执行，不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.load_prompts_from_file, filepath)
+        
+    async def asave_prompts_to_file(self, filepath: str):
+        """异步保存prompts到文件"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.save_prompts_to_file, filepath)
             
     def _get_demand_network_query_parser_prompt(self) -> str:
         """获取需求网络查询解析prompt"""
@@ -342,4 +446,19 @@ class PromptManager:
 3. 使用简洁明了的语言，避免过多的技术术语
 4. 如果没有相关内容，请设置为null或空数组
 5. 重点关注市场需求、消费者行为和市场趋势
-6. 提供可操作的洞察和建议"""
\ No newline at end of file
+6. 提供可操作的洞察和建议"""
+
+
+_DEFAULT_INSTANCE: Optional[PromptManager] = None
+
+
+def get_default_prompt_manager() -> PromptManager:
+    """获取进程级共享的默认PromptManager
+
+    Agent未指定自定义PromptManager时使用该实例，避免每个（子）Agent重复创建。
+    需要按Agent定制prompt时，应传入独立的PromptManager实例，而不是修改共享实例。
+    """
+    global _DEFAULT_INSTANCE
+    if _DEFAULT_INSTANCE is None:
+        _DEFAULT_INSTANCE = PromptManager()
+    return _DEFAULT_INSTANCE
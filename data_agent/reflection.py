@@ -4,6 +4,8 @@ import json
 class ReflectionEngine:
     """反思引擎，实现多轮反思和迭代优化能力"""
     
+    __slots__ = ("agent", "reflection_history")
+    
     def __init__(self, agent):
         self.agent = agent
         self.reflection_history: List[Dict[str, Any]] = []
@@ -18,24 +20,7 @@ class ReflectionEngine:
         # 构建反思prompt
         reflection_prompt = self.agent.prompt_manager.get_prompt("reflection_analyzer")
         if not reflection_prompt:
-            reflection_prompt = """你是一个AI反思专家。请对当前的分析结果进行深度思考和优化。
-
-原始查询: {original_query}
-当前结果: {current_result}
-
-请执行以下反思和优化:
-1. 分析当前结果的不足之处
-2. 识别可能被忽略的要点
-3. 提出改进建议
-4. 如有必要，生成更深入的分析请求
-
-请严格按照以下JSON格式返回结果，不要包含其他文字:
-{
-  "analysis": "当前结果的不足分析",
-  "improvement_suggestions": ["建议1", "建议2"],
-  "deep_analysis_needed": true,
-  "new_query": "如果需要深入分析，请提供新的查询"
-}"""
+            raise ValueError("PromptManager缺少reflection_analyzer prompt")
 
         # 进行多轮反思
         result = current_result
@@ -67,13 +52,7 @@ class ReflectionEngine:
                     suggestions = reflection_result.get("improvement_suggestions", [])
                     if suggestions:
                         # 构建优化prompt
-                        optimization_prompt = """你是一个AI优化专家。请基于以下建议优化分析结果。
-
-原始查询: {original_query}
-当前结果: {current_result}
-优化建议: {suggestions}
-
-请提供优化后的结果，要求更加全面、准确和深入。"""
+                        optimization_prompt = self.agent.prompt_manager.get_prompt("optimization_prompt")
                         
                         optimization_context = {
                             "original_query": query,
@@ -85,7 +64,8 @@ class ReflectionEngine:
             
             # 记录反思和优化过程
             self.agent.debug_manager.log_llm_input(f"反思迭代 {i+1}", context)
-            self.agent.debug_manager.log_llm_output(json.dumps(reflection_result, ensure_ascii=False, indent=2))
+            if self.agent.debug_manager.enabled:
+                self.agent.debug_manager.log_llm_output(json.dumps(reflection_result, ensure_ascii=False, indent=2))
         
         return result
     
@@ -100,19 +80,7 @@ class ReflectionEngine:
         # 例如，将时间分配给不同的分析阶段
         
         # 构建长时间思考prompt
-        long_thinking_prompt = """你有更多时间来深入分析这个问题。请进行更全面、更细致的思考。
-
-原始查询: {original_query}
-思考时间: {time_allocation}分钟
-
-请按照以下步骤进行深入分析:
-1. 问题分解：将复杂问题拆分为多个子问题
-2. 多角度分析：从不同维度审视问题
-3. 数据验证：检查数据的准确性和完整性
-4. 方案对比：比较不同解决方案的优劣
-5. 风险评估：识别潜在风险和应对措施
-
-请提供详细、深入的分析结果。"""
+        long_thinking_prompt = self.agent.prompt_manager.get_prompt("long_thinking_prompt")
         
         context = {
             "original_query": query,
@@ -124,7 +92,8 @@ class ReflectionEngine:
         
         # 记录思考过程
         self.agent.debug_manager.log_llm_input("长时间思考", context)
-        self.agent.debug_manager.log_llm_output(json.dumps(result, ensure_ascii=False, indent=2))
+        if self.agent.debug_manager.enabled:
+            self.agent.debug_manager.log_llm_output(json.dumps(result, ensure_ascii=False, indent=2))
         
         return result
     
@@ -144,30 +113,7 @@ class ReflectionEngine:
             return f"方法比较完成，原始查询: {query}"
             
         # 构建方法比较prompt
-        comparison_prompt = """你是一个AI分析专家。请比较不同方法的优劣。
-
-原始查询: {original_query}
-待比较方法: {approaches}
-
-请按照以下步骤进行分析:
-1. 分析每种方法的适用场景
-2. 比较每种方法的优缺点
-3. 评估每种方法的风险
-4. 给出推荐方案
-
-请严格按照以下JSON格式返回结果:
-{
-  "approach_analysis": [
-    {
-      "approach": "方法1",
-      "pros": ["优点1", "优点2"],
-      "cons": ["缺点1", "缺点2"],
-      "risk_assessment": "风险评估"
-    }
-  ],
-  "recommendation": "推荐方案",
-  "reasoning": "推荐理由"
-}"""
+        comparison_prompt = self.agent.prompt_manager.get_prompt("comparison_prompt")
         
         context = {
             "original_query": query,
@@ -179,6 +125,7 @@ class ReflectionEngine:
         
         # 记录比较过程
         self.agent.debug_manager.log_llm_input("方法比较", context)
-        self.agent.debug_manager.log_llm_output(json.dumps(result, ensure_ascii=False, indent=2))
+        if self.agent.debug_manager.enabled:
+            self.agent.debug_manager.log_llm_output(json.dumps(result, ensure_ascii=False, indent=2))
         
         return result
\ No newline at end of file
@@ -5,15 +5,17 @@
 import asyncio
 import sys
 import os
-import logging
+from collections import Counter
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from data_agent.agent import DataAnalysisAgent, AgentConfig
+from data_agent.utils.text import truncate
+from data_agent.utils.log_config import setup_logging
 
 # 配置日志
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 
 async def test_basic_functionality():
     """测试基本功能"""
@@ -36,31 +38,44 @@ async def test_basic_functionality():
         "比较两个产品的性能"
     ]
     
-    for i, query in enumerate(test_cases, 1):
+    # 并发执行所有测试用例
+    try:
+        results = await asyncio.gather(
+            *(run_query(agent, query) for query in test_cases),
+            return_exceptions=True
+        )
+    finally:
+        await agent.aclose()
+    
+    for i, (query, outcome) in enumerate(zip(test_cases, results), 1):
         print(f"\n--- 测试用例 {i}: {query} ---")
-        try:
-            result = await agent.process_query(query)
-            print("处理结果:")
-            print(result[:200] + "..." if len(result) > 200 else result)
-            
-            # 检查是否有错误日志
-            error_logs = [log for log in agent.debug_manager.logs if log['type'] == 'error']
-            if error_logs:
-                print(f"警告: 发现 {len(error_logs)} 个错误日志")
-        except Exception as e:
-            print(f"测试失败: {e}")
+        if isinstance(outcome, Exception):
+            print(f"测试失败: {outcome}")
+            continue
+        
+        result, error_logs = outcome
+        print("处理结果:")
+        print(truncate(result))
+        
+        # 检查是否有错误日志
+        if error_logs:
+            print(f"警告: 发现 {len(error_logs)} 个错误日志")
     
     print("\n--- 测试完成 ---")
     
     # 显示调试信息统计
-    log_types = {}
-    for log in agent.debug_manager.logs:
-        log_type = log['type']
-        log_types[log_type] = log_types.get(log_type, 0) + 1
+    log_types = Counter(log['type'] for log in agent.debug_manager.logs)
     
     print("调试日志统计:")
     for log_type, count in log_types.items():
         print(f"  {log_type}: {count}")
 
+async def run_query(agent: DataAnalysisAgent, query: str):
+    """处理单个查询，返回结果及本次查询会话中的错误日志"""
+    result = await agent.process_query(query)
+    session_logs = agent.debug_manager.get_logs(agent.debug_manager.current_session_id)
+    error_logs = [log for log in session_logs if log['type'] == 'error']
+    return result, error_logs
+
 if __name__ == "__main__":
     asyncio.run(test_basic_functionality())
\ No newline at end of file
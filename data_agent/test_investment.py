@@ -7,15 +7,17 @@
 import asyncio
 import sys
 import os
-import logging
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from data_agent.agent import DataAnalysisAgent, AgentConfig
+from data_agent.agent import AgentConfig
+from data_agent.agent_pool import AgentPool
+from data_agent.utils.text import truncate
+from data_agent.utils.log_config import setup_logging
 
 # 配置日志
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 
 async def test_investment_queries():
     """测试投资相关查询"""
@@ -30,8 +32,6 @@ async def test_investment_queries():
             default_llm="qwen"
         )
         
-        agent = DataAnalysisAgent(config)
-        
         # 投资相关测试查询
         investment_queries = [
             "查询苹果公司(AAPL)最近一季度的财务数据",
@@ -41,27 +41,37 @@ async def test_investment_queries():
             "评估谷歌(GOOG)的投资风险"
         ]
         
-        for i, query in enumerate(investment_queries, 1):
+        # 所有查询共用池中的一个Agent，并发提交的查询在acquire()中排队
+        async with AgentPool(config, size=1) as pool:
+            results = await asyncio.gather(
+                *(run_query(pool, query) for query in investment_queries),
+                return_exceptions=True
+            )
+        
+        for i, (query, outcome) in enumerate(zip(investment_queries, results), 1):
             print(f"\n[{i}] 用户查询: {query}")
             print("-" * 40)
             
-            try:
-                result = await agent.process_query(query)
-                print("处理结果:")
-                print(result[:300] + "..." if len(result) > 300 else result)
-                
-                # 显示调试信息
-                mcp_calls = [log for log in agent.debug_manager.logs if log['type'] == 'mcp_input']
-                print(f"MCP调用次数: {len(mcp_calls)}")
-                
-            except Exception as e:
-                print(f"处理查询时出错: {e}")
+            if isinstance(outcome, Exception):
+                print(f"处理查询时出错: {outcome}")
+                continue
+            
+            result, mcp_call_count = outcome
+            print("处理结果:")
+            print(truncate(result, 300))
             
-            # 清空日志以准备下一个查询
-            agent.debug_manager.clear_logs()
+            # 显示调试信息
+            print(f"MCP调用次数: {mcp_call_count}")
                 
     except Exception as e:
         print(f"投资分析测试失败: {e}")
 
+async def run_query(pool: AgentPool, query: str):
+    """处理单个查询，返回结果及本次查询会话中的MCP调用次数"""
+    async with pool.agent() as agent:
+        result = await agent.process_query(query)
+        debug_manager = agent.debug_manager
+        return result, debug_manager.count_by_type("mcp_input", debug_manager.current_session_id)
+
 if __name__ == "__main__":
     asyncio.run(test_investment_queries())
\ No newline at end of file
@@ -7,15 +7,16 @@ LLM集成测试
 import asyncio
 import sys
 import os
-import logging
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from data_agent.agent import DataAnalysisAgent, AgentConfig
+from data_agent.utils.text import truncate
+from data_agent.utils.log_config import setup_logging
 
 # 配置日志
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 
 async def test_llm_integration():
     """测试LLM集成"""
@@ -34,7 +35,7 @@ async def test_llm_integration():
         agent = DataAnalysisAgent(config)
         result = await agent.process_query("你是谁？")
         print("Qwen回复:")
-        print(result[:200] + "..." if len(result) > 200 else result)
+        print(truncate(result))
     except Exception as e:
         print(f"Qwen测试失败: {e}")
     
@@ -51,7 +52,7 @@ async def test_llm_integration():
         agent = DataAnalysisAgent(config)
         result = await agent.process_query("你是谁？")
         print("DeepSeek回复:")
-        print(result[:200] + "..." if len(result) > 200 else result)
+        print(truncate(result))
     except Exception as e:
         print(f"DeepSeek测试失败: {e}")
 
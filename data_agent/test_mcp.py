@@ -7,50 +7,26 @@ MCP集成测试
 import asyncio
 import sys
 import os
-import logging
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from data_agent.agent import DataAnalysisAgent, AgentConfig
+from data_agent.agent import AgentConfig
+from data_agent.agent_pool import AgentPool
 from data_agent.mcp_tools.mcp_client import MCPClient
+from data_agent.mcp_tools.default_configs import build_mcp_config
+from data_agent.utils.text import truncate
+from data_agent.utils.log_config import setup_logging
 
 # 配置日志
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 
 async def test_mcp_client():
     """测试MCP客户端"""
     print("开始测试MCP客户端...")
     
     # 创建MCP配置
-    mcp_config = {
-        "mcpServers": {
-            "sec-fetch-production": {
-                "type": "sse",
-                "url": "http://localhost:8000/mcp",
-                "headers": {
-                    "X-API-Key": os.getenv("MCP_API_KEY", "your-api-key-here")
-                },
-                "serverInstructions": "SEC财报数据分析服务，支持完整的13F和财务数据查询"
-            },
-            "sec-investment-analysis": {
-                "type": "sse",
-                "url": "http://localhost:8001/mcp",
-                "headers": {
-                    "X-API-Key": os.getenv("MCP_INVESTMENT_API_KEY", "your-api-key-here")
-                },
-                "serverInstructions": "SEC投资分析服务，提供巴菲特风格的投资分析功能"
-            },
-            "sec-stock-query": {
-                "type": "sse",
-                "url": "http://localhost:8002/mcp",
-                "headers": {
-                    "X-API-Key": os.getenv("ALPHA_VANTAGE_KEY", "your-alpha-vantage-key")
-                },
-                "serverInstructions": "Alpha Vantage股票查询服务，提供实时股票数据和技术分析"
-            }
-        }
-    }
+    mcp_config = build_mcp_config()
     
     # 测试MCP客户端初始化
     print("\n--- 测试MCP客户端初始化 ---")
@@ -82,8 +58,6 @@ async def test_mcp_with_agent():
             default_llm="qwen"
         )
         
-        agent = DataAnalysisAgent(config)
-        
         # 测试查询解析（模拟MCP工具调用）
         test_queries = [
             "查询苹果公司最近一季度的财务数据",
@@ -91,19 +65,30 @@ async def test_mcp_with_agent():
             "获取特斯拉的实时股价和技术分析"
         ]
         
-        for query in test_queries:
+        # 各查询共用池中的一个Agent，并发提交的查询在acquire()中排队
+        # 注意：实际的MCP服务可能需要API密钥才能正常工作
+        async with AgentPool(config, size=1) as pool:
+            results = await asyncio.gather(
+                *(run_query(pool, query) for query in test_queries),
+                return_exceptions=True
+            )
+        
+        for query, result in zip(test_queries, results):
             print(f"\n测试查询: {query}")
-            try:
-                # 注意：实际的MCP服务可能需要API密钥才能正常工作
-                result = await agent.process_query(query)
-                print("处理结果:")
-                print(result[:200] + "..." if len(result) > 200 else result)
-            except Exception as e:
-                print(f"处理查询时出错: {e}")
+            if isinstance(result, Exception):
+                print(f"处理查询时出错: {result}")
+                continue
+            print("处理结果:")
+            print(truncate(result))
                 
     except Exception as e:
         print(f"Agent与MCP集成测试失败: {e}")
 
+async def run_query(pool: AgentPool, query: str):
+    """从Agent池借用一个Agent处理单个查询"""
+    async with pool.agent() as agent:
+        return await agent.process_query(query)
+
 if __name__ == "__main__":
     asyncio.run(test_mcp_client())
     asyncio.run(test_mcp_with_agent())
\ No newline at end of file
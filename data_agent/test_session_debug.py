@@ -54,5 +54,119 @@ async def test_session_debug():
     for session in sessions:
         print(f"  会话ID: {session['session_id']}, 日志数: {session['log_count']}")
 
+def _seqs(logs):
+    """提取日志序号"""
+    return [log["seq"] for log in logs]
+
+def test_eviction_keeps_indexes_consistent():
+    """日志超出容量后，类型索引、会话索引和计数同步淘汰"""
+    debug_manager = DebugManager(enabled=True, max_logs=4)
+    
+    session1_id = debug_manager.start_new_session()
+    debug_manager.log_llm_input("输入1")            # seq 1，将被淘汰
+    debug_manager.log_llm_input("输入2")            # seq 2，将被淘汰
+    debug_manager.log_mcp_input("tool", {"a": 1})   # seq 3
+    
+    session2_id = debug_manager.start_new_session()
+    debug_manager.log_llm_input("输入3")            # seq 4
+    debug_manager.log_error(Exception("错误1"))     # seq 5
+    debug_manager.log_error(Exception("错误2"))     # seq 6
+    
+    assert _seqs(debug_manager.get_logs()) == [3, 4, 5, 6]
+    assert _seqs(debug_manager.get_by_type("llm_input")) == [4]
+    assert debug_manager.count_by_type("llm_input") == 1
+    assert debug_manager.count_by_type("error") == 2
+    assert debug_manager.count_by_type("llm_input", session1_id) == 0
+    assert debug_manager.count_by_type("mcp_input", session1_id) == 1
+    assert debug_manager.count_by_type("error", session2_id) == 2
+    assert _seqs(debug_manager.get_logs(session1_id)) == [3]
+    assert _seqs(debug_manager.get_logs(session2_id)) == [4, 5, 6]
+    
+    sessions = {s["session_id"]: s for s in debug_manager.get_sessions()}
+    assert sessions[session1_id]["log_count"] == 1
+    assert sessions[session1_id]["start_time"] == debug_manager.get_logs(session1_id)[0]["timestamp"]
+    assert sessions[session2_id]["log_count"] == 3
+    
+    # 会话1的最后一条日志被淘汰后，会话本身也从索引中移除
+    debug_manager.log_mcp_input("tool", {"a": 2})   # seq 7，淘汰seq 3
+    assert [s["session_id"] for s in debug_manager.get_sessions()] == [session2_id]
+    assert debug_manager.get_logs(session1_id) == []
+    assert debug_manager.count_by_type("mcp_input", session1_id) == 0
+    assert debug_manager.count_by_type("mcp_input") == 1
+    assert debug_manager.get_by_type("llm_output") == []
+
+def test_set_max_logs_shrinks_store():
+    """缩小容量时淘汰最旧的日志并同步索引"""
+    debug_manager = DebugManager(enabled=True)
+    session_id = debug_manager.start_new_session()
+    for i in range(5):
+        debug_manager.log_llm_input(f"输入{i}")
+    debug_manager.log_error(Exception("错误"))
+    
+    debug_manager.set_max_logs(2)
+    assert _seqs(debug_manager.get_logs()) == [5, 6]
+    assert _seqs(debug_manager.get_by_type("llm_input")) == [5]
+    assert debug_manager.count_by_type("llm_input", session_id) == 1
+    assert debug_manager.get_sessions()[0]["log_count"] == 2
+    
+    # 缩小后的容量继续生效
+    debug_manager.log_llm_input("输入5")
+    assert _seqs(debug_manager.get_logs()) == [6, 7]
+    
+    try:
+        debug_manager.set_max_logs(0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("set_max_logs(0) 应抛出 ValueError")
+
+def test_since_limit_paging_across_eviction():
+    """since/limit分页跨越淘汰边界时不漏掉仍保留的日志"""
+    debug_manager = DebugManager(enabled=True, max_logs=5)
+    session_id = debug_manager.start_new_session()
+    for i in range(8):
+        debug_manager.log_llm_input(f"输入{i}")     # seq 1-8，保留4-8
+    
+    # since早于淘汰边界时，从最早仍保留的日志开始
+    assert _seqs(debug_manager.get_logs(since=1, limit=2)) == [4, 5]
+    
+    # 按最后序号继续翻页，依次取完剩余日志
+    pages, since = [], 0
+    while True:
+        page = debug_manager.get_logs(session_id, since=since, limit=2)
+        if not page:
+            break
+        pages.append(_seqs(page))
+        since = page[-1]["seq"]
+    assert pages == [[4, 5], [6, 7], [8]]
+    
+    # 只给limit时返回最近的日志
+    assert _seqs(debug_manager.get_logs(limit=2)) == [7, 8]
+    assert _seqs(debug_manager.get_logs_since(session_id, 6)) == [7, 8]
+
+def test_sessions_listing():
+    """会话列表：无会话的日志不产生会话；有会话时返回各会话的日志条数"""
+    debug_manager = DebugManager(enabled=True)
+    debug_manager.log_llm_input("会话外的输入")
+    debug_manager.log_error(Exception("会话外的错误"))
+    assert debug_manager.get_sessions() == []
+    assert len(debug_manager.get_logs()) == 2
+    
+    session1_id = debug_manager.start_new_session()
+    debug_manager.log_llm_input("输入1")
+    debug_manager.log_llm_output("输出1")
+    session2_id = debug_manager.start_new_session()
+    debug_manager.log_mcp_input("tool", {})
+    
+    sessions = debug_manager.get_sessions()
+    assert [s["session_id"] for s in sessions] == [session1_id, session2_id]
+    assert [s["log_count"] for s in sessions] == [2, 1]
+    assert debug_manager.count_by_type("llm_output", session1_id) == 1
+    assert debug_manager.count_by_type("llm_output", session2_id) == 0
+
 if __name__ == "__main__":
-    asyncio.run(test_session_debug())
\ No newline at end of file
+    asyncio.run(test_session_debug())
+    for check in (test_eviction_keeps_indexes_consistent, test_set_max_logs_shrinks_store,
+                  test_since_limit_paging_across_eviction, test_sessions_listing):
+        check()
+        print(f"✓ {check.__name__}")
\ No newline at end of file
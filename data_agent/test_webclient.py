@@ -6,67 +6,109 @@ Web客户端功能测试脚本
 import asyncio
 import aiohttp
 import json
+from typing import Optional, Tuple
+
+# 模块级复用的HTTP会话，避免每次测试重新建立连接
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+
+def _get_session() -> aiohttp.ClientSession:
+    """获取（必要时创建）共享的HTTP会话"""
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        connector = aiohttp.TCPConnector(limit=64, ttl_dns_cache=300, keepalive_timeout=30)
+        _SESSION = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=120)
+        )
+    return _SESSION
+
+
+async def _close_session():
+    """关闭共享的HTTP会话"""
+    global _SESSION
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+
+
+BASE_URL = "http://localhost:8080"
+
+
+async def _check_health(session: aiohttp.ClientSession) -> Tuple[str, bool, str]:
+    """测试健康检查接口"""
+    async with session.get(f"{BASE_URL}/api/health") as resp:
+        if resp.status == 200:
+            data = await resp.json()
+            return "健康检查接口", True, f"健康检查成功: {data}"
+        return "健康检查接口", False, f"健康检查失败: {resp.status}"
+
+
+async def _check_chat(session: aiohttp.ClientSession) -> Tuple[str, bool, str]:
+    """测试聊天接口"""
+    test_message = "分析苹果公司最近一季度的财务数据"
+    async with session.post(
+        f"{BASE_URL}/api/chat",
+        json={"message": test_message}
+    ) as resp:
+        data = await resp.json()
+        if resp.status == 200:
+            return "聊天接口", True, f"聊天接口成功\n   响应: {str(data['response'])[:100]}..."
+        return "聊天接口", False, f"聊天接口失败: {resp.status}\n   错误: {data}"
+
+
+async def _check_ws(session: aiohttp.ClientSession) -> Tuple[str, bool, str]:
+    """测试WebSocket连接"""
+    try:
+        async with session.ws_connect(f"{BASE_URL}/api/ws") as ws:
+            # 发送测试消息
+            test_msg = {"message": "获取特斯拉的实时股价"}
+            await ws.send_str(json.dumps(test_msg))
+
+            # 等待响应
+            msg = await asyncio.wait_for(ws.receive(), timeout=10.0)
+            await ws.close()
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                data = json.loads(msg.data)
+                return "WebSocket连接", True, f"收到WebSocket响应: {str(data)[:100]}..."
+            if msg.type == aiohttp.WSMsgType.ERROR:
+                return "WebSocket连接", False, f"WebSocket错误: {ws.exception()}"
+            return "WebSocket连接", False, f"意外的消息类型: {msg.type}"
+    except asyncio.TimeoutError:
+        return "WebSocket连接", False, "WebSocket连接超时"
+
+
+async def test_web_client(session: Optional[aiohttp.ClientSession] = None):
+    """并发测试Web客户端功能，结果按固定顺序输出"""
+    session = session or _get_session()
+    checks = [
+        ("健康检查接口", _check_health),
+        ("聊天接口", _check_chat),
+        ("WebSocket连接", _check_ws),
+    ]
+    results = await asyncio.gather(
+        *(check(session) for _, check in checks),
+        return_exceptions=True
+    )
+
+    for i, ((name, _), result) in enumerate(zip(checks, results), 1):
+        print(f"\n{i}. 测试{name}...")
+        if isinstance(result, Exception):
+            print(f"   ✗ {name}测试失败: {result}")
+            continue
+        _, ok, detail = result
+        print(f"   {'✓' if ok else '✗'} {detail}")
+
+
+async def main():
+    """在同一个会话中运行全部测试"""
+    try:
+        await test_web_client(_get_session())
+    finally:
+        await _close_session()
 
-async def test_web_client():
-    """测试Web客户端功能"""
-    base_url = "http://localhost:8080"
-    
-    async with aiohttp.ClientSession() as session:
-        try:
-            # 1. 测试健康检查接口
-            print("1. 测试健康检查接口...")
-            async with session.get(f"{base_url}/api/health") as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    print(f"   ✓ 健康检查成功: {data}")
-                else:
-                    print(f"   ✗ 健康检查失败: {resp.status}")
-            
-            # 2. 测试聊天接口
-            print("\n2. 测试聊天接口...")
-            test_message = "分析苹果公司最近一季度的财务数据"
-            async with session.post(
-                f"{base_url}/api/chat",
-                json={"message": test_message}
-            ) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    print(f"   ✓ 聊天接口成功")
-                    print(f"   响应: {str(data['response'])[:100]}...")
-                else:
-                    print(f"   ✗ 聊天接口失败: {resp.status}")
-                    error_data = await resp.json()
-                    print(f"   错误: {error_data}")
-            
-            # 3. 测试WebSocket连接
-            print("\n3. 测试WebSocket连接...")
-            try:
-                async with session.ws_connect(f"{base_url}/api/ws") as ws:
-                    print("   ✓ WebSocket连接成功")
-                    
-                    # 发送测试消息
-                    test_msg = {"message": "获取特斯拉的实时股价"}
-                    await ws.send_str(json.dumps(test_msg))
-                    print("   ✓ 发送测试消息")
-                    
-                    # 等待响应
-                    msg = await asyncio.wait_for(ws.receive(), timeout=10.0)
-                    if msg.type == aiohttp.WSMsgType.TEXT:
-                        data = json.loads(msg.data)
-                        print(f"   ✓ 收到WebSocket响应: {str(data)[:100]}...")
-                    elif msg.type == aiohttp.WSMsgType.ERROR:
-                        print(f"   ✗ WebSocket错误: {ws.exception()}")
-                    
-                    await ws.close()
-            except asyncio.TimeoutError:
-                print("   ✗ WebSocket连接超时")
-            except Exception as e:
-                print(f"   ✗ WebSocket测试失败: {e}")
-                
-        except Exception as e:
-            print(f"测试过程中出现错误: {e}")
 
 if __name__ == "__main__":
     print("开始测试Web客户端功能...")
-    asyncio.run(test_web_client())
+    asyncio.run(main())
     print("\n测试完成。")
\ No newline at end of file
@@ -6,8 +6,9 @@
 
 import argparse
 import asyncio
+import contextlib
+import io
 import sys
-import json
 import os
 from typing import Optional, List
 
@@ -15,16 +16,51 @@ from typing import Optional, List
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from data_agent.agent import DataAnalysisAgent, AgentConfig
+from data_agent.agent_pool import AgentPool
 from data_agent.mcp_tools.mcp_client import MCPClient
+from data_agent.mcp_tools.default_configs import build_mcp_config
+from data_agent.utils import json_utils
+from data_agent.utils.text import truncate
+
+@contextlib.contextmanager
+def _buffered_stdout():
+    """将标准输出缓冲到内存，结束时一次性写出"""
+    buf = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buf):
+            yield buf
+    finally:
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
 
 class UnifiedAgentCLI:
     """统一的Agent命令行界面"""
     
+    # 子命令到处理方法的映射，解析器按 _add_<命令>_parser 命名
+    _DISPATCH = {
+        'query': '_run_query',
+        'status': '_run_status_check',
+        'test-mcp': '_run_mcp_test',
+        'test-investment': '_run_investment_test',
+    }
+    
+    # 输出较多的命令先缓冲输出，结束后一次性写出
+    _BUFFERED_COMMANDS = frozenset({'status', 'test-investment'})
+    
     def __init__(self):
-        self.parser = self._create_parser()
+        # 解析器按需构建，只创建实际使用的子命令解析器
+        self.parser: Optional[argparse.ArgumentParser] = None
+    
+    @staticmethod
+    def _peek_command(args: Optional[List[str]]) -> Optional[str]:
+        """预解析命令名，不构建完整解析器"""
+        pre_parser = argparse.ArgumentParser(add_help=False)
+        pre_parser.add_argument('command', nargs='?')
+        known_args, _ = pre_parser.parse_known_args(args)
+        return known_args.command
     
-    def _create_parser(self) -> argparse.ArgumentParser:
-        """创建命令行参数解析器"""
+    def _create_parser(self, command: Optional[str] = None) -> argparse.ArgumentParser:
+        """创建命令行参数解析器，指定命令时只添加该命令的子解析器"""
         parser = argparse.ArgumentParser(
             prog='data-agent-cli',
             description="数据分析Agent统一命令行工具",
@@ -57,17 +93,10 @@ class UnifiedAgentCLI:
         # 添加子命令
         subparsers = parser.add_subparsers(dest='command', help='可用命令')
         
-        # 查询命令
-        self._add_query_parser(subparsers)
-        
-        # 状态检查命令
-        self._add_status_parser(subparsers)
-        
-        # MCP测试命令
-        self._add_test_mcp_parser(subparsers)
-        
-        # 投资分析测试命令
-        self._add_test_investment_parser(subparsers)
+        # 未知命令或显示帮助时才构建全部子命令
+        commands = [command] if command in self._DISPATCH else list(self._DISPATCH)
+        for name in commands:
+            getattr(self, f"_add_{name.replace('-', '_')}_parser")(subparsers)
         
         return parser
     
@@ -134,9 +163,16 @@ class UnifiedAgentCLI:
             action='store_true',
             help='显示详细测试结果'
         )
+        parser_test_inv.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='同时处理的查询数上限，即创建的Agent数 (默认: 1)'
+        )
     
     async def run(self, args: Optional[List[str]] = None):
         """运行CLI工具"""
+        self.parser = self._create_parser(self._peek_command(args))
         parsed_args = self.parser.parse_args(args)
         
         # 如果没有指定命令，显示帮助信息
@@ -145,18 +181,13 @@ class UnifiedAgentCLI:
             return
         
         try:
-            if parsed_args.command == 'query':
-                await self._run_query(parsed_args)
-            elif parsed_args.command == 'status':
-                await self._run_status_check(parsed_args)
-            elif parsed_args.command == 'test-mcp':
-                await self._run_mcp_test(parsed_args)
-            elif parsed_args.command == 'test-investment':
-                await self._run_investment_test(parsed_args)
+            handler = getattr(self, self._DISPATCH[parsed_args.command])
+            if parsed_args.command in self._BUFFERED_COMMANDS:
+                output = _buffered_stdout()
             else:
-                print(f"未知命令: {parsed_args.command}")
-                self.parser.print_help()
-                sys.exit(1)
+                output = contextlib.nullcontext()
+            with output:
+                await handler(parsed_args)
         except Exception as e:
             print(f"错误: {e}", file=sys.stderr)
             sys.exit(1)
@@ -183,13 +214,15 @@ class UnifiedAgentCLI:
             
             # 格式化输出
             if args.format == 'json':
-                print(json.dumps(result, ensure_ascii=False, indent=2))
+                print(json_utils.dumps(result, indent=True))
             else:
                 print(result)
                 
         except Exception as e:
             print(f"查询处理失败: {e}", file=sys.stderr)
             sys.exit(1)
+        finally:
+            await agent.aclose()
     
     async def _run_status_check(self, args):
         """运行状态检查命令"""
@@ -291,35 +324,14 @@ class UnifiedAgentCLI:
                     "default_llm": agent.config.default_llm
                 }
             }
-            print("\n" + json.dumps(status_info, ensure_ascii=False, indent=2))
+            print("\n" + json_utils.dumps(status_info, indent=True))
     
     async def _run_mcp_test(self, args):
         """运行MCP测试命令"""
         print("=== MCP服务连通性检查 ===\n")
         
         # 使用默认配置创建MCP客户端
-        mcp_config = {
-            "mcpServers": {
-                "sec-fetch-production": {
-                    "type": "sse",
-                    "url": "http://localhost:8000/mcp",
-                    "headers": {},
-                    "serverInstructions": "SEC财报数据分析服务"
-                },
-                "sec-investment-analysis": {
-                    "type": "sse",
-                    "url": "http://localhost:8001/mcp",
-                    "headers": {},
-                    "serverInstructions": "SEC投资分析服务"
-                },
-                "sec-stock-query": {
-                    "type": "sse",
-                    "url": "http://localhost:8002/mcp",
-                    "headers": {},
-                    "serverInstructions": "Alpha Vantage股票查询服务"
-                }
-            }
-        }
+        mcp_config = build_mcp_config(with_api_keys=False)
         
         test_results = {
             "servers": {}
@@ -345,7 +357,7 @@ class UnifiedAgentCLI:
                         # 尝试获取服务器说明
                         instructions = server_info.get('instructions', '')
                         if instructions:
-                            print(f"    说明: {instructions[:50]}{'...' if len(instructions) > 50 else ''}")
+                            print(f"    说明: {truncate(instructions, 50)}")
                 print()
                 
         except Exception as e:
@@ -355,7 +367,7 @@ class UnifiedAgentCLI:
         
         # 如果指定了JSON输出
         if args.json:
-            print(json.dumps(test_results, ensure_ascii=False, indent=2))
+            print(json_utils.dumps(test_results, indent=True))
     
     async def _run_investment_test(self, args):
         """运行投资分析测试命令"""
@@ -370,8 +382,6 @@ class UnifiedAgentCLI:
                 default_llm="qwen"
             )
             
-            agent = DataAnalysisAgent(config)
-            
             # 投资相关测试查询
             investment_queries = [
                 "查询苹果公司(AAPL)最近一季度的财务数据",
@@ -385,41 +395,31 @@ class UnifiedAgentCLI:
                 "queries": []
             }
             
-            for i, query in enumerate(investment_queries, 1):
-                print(f"\n[{i}] 用户查询: {query}")
+            # 并发处理查询，Agent池大小即同时进行的查询数上限
+            async with AgentPool(config, size=max(1, args.concurrency)) as pool:
+                query_results = await asyncio.gather(*(
+                    self._run_investment_query(pool, query)
+                    for query in investment_queries
+                ))
+            
+            for i, query_result in enumerate(query_results, 1):
+                print(f"\n[{i}] 用户查询: {query_result['query']}")
                 print("-" * 40)
                 
-                query_result = {
-                    "query": query,
-                    "success": False
-                }
-                
-                try:
-                    result = await agent.process_query(query)
-                    query_result["success"] = True
-                    query_result["result"] = result
-                    
+                if query_result["success"]:
                     if args.verbose:
                         print("处理结果:")
-                        print(result[:500] + "..." if len(result) > 500 else result)
+                        print(truncate(query_result["result"], 500))
                     else:
                         print("处理结果: 成功")
                     
                     # 显示调试信息
-                    mcp_calls = [log for log in agent.debug_manager.logs if log['type'] == 'mcp_input']
-                    print(f"MCP调用次数: {len(mcp_calls)}")
-                    query_result["mcp_calls"] = len(mcp_calls)
-                    
-                except Exception as e:
-                    error_msg = f"处理查询时出错: {e}"
-                    print(error_msg)
-                    query_result["error"] = error_msg
+                    print(f"MCP调用次数: {query_result['mcp_calls']}")
+                else:
+                    print(query_result["error"])
                 
                 test_results["queries"].append(query_result)
                 
-                # 清空日志以准备下一个查询
-                agent.debug_manager.clear_logs()
-                
         except Exception as e:
             error_msg = f"投资分析测试失败: {e}"
             print(error_msg)
@@ -428,6 +428,26 @@ class UnifiedAgentCLI:
         print("\n" + "=" * 50)
         print("投资分析测试完成")
 
+    async def _run_investment_query(self, pool: AgentPool, query: str) -> dict:
+        """处理单个投资测试查询，统计本次查询会话中的MCP调用次数"""
+        query_result = {
+            "query": query,
+            "success": False
+        }
+        
+        async with pool.agent() as agent:
+            try:
+                result = await agent.process_query(query)
+                query_result["success"] = True
+                query_result["result"] = result
+                
+                debug_manager = agent.debug_manager
+                query_result["mcp_calls"] = debug_manager.count_by_type("mcp_input", debug_manager.current_session_id)
+            except Exception as e:
+                query_result["error"] = f"处理查询时出错: {e}"
+        
+        return query_result
+
 def main():
     """主函数"""
     cli = UnifiedAgentCLI()
@@ -1,42 +1,147 @@
+import asyncio
+import contextvars
+import itertools
 import logging
-import json
+import time
 import uuid
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 
-# 模拟langfuse导入
-try:
-    from langfuse import Langfuse
-    LANGFUSE_AVAILABLE = True
-except ImportError:
-    LANGFUSE_AVAILABLE = False
-    Langfuse = None
+from data_agent.utils import json_utils
 
 logger = logging.getLogger(__name__)
 
+# 各DebugManager在当前任务上下文中的会话ID：{管理器编号: 会话ID}。
+# ContextVar应只在模块级创建，所有管理器共用这一个变量；写入时复制映射，不影响其他上下文
+_SESSION_IDS: contextvars.ContextVar = contextvars.ContextVar("debug_session_ids", default={})
+# 管理器编号，不使用id()，避免对象回收后编号被新管理器复用
+_manager_keys = itertools.count(1)
+
+@dataclass
+class SessionMeta:
+    """调试会话元信息"""
+    __slots__ = ("session_id", "start_time", "end_time", "log_count")
+    
+    session_id: str
+    start_time: str
+    end_time: str
+    log_count: int
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "start_time": self.start_time,
+            "log_count": self.log_count,
+            "end_time": self.end_time
+        }
+
 class DebugManager:
     """调试管理器，用于跟踪LLM和MCP的输入输出"""
     
-    def __init__(self, enabled: bool = True, langfuse_enabled: bool = False):
+    # 默认最多保留的日志条数，超出后淘汰最旧的日志
+    MAX_LOGS = 10_000
+    # Langfuse批量上报时每批的最大事件数
+    LANGFUSE_BATCH_SIZE = 50
+    # 禁用调试时替换为空操作的记录方法
+    _LOG_METHODS = ("log_llm_input", "log_llm_output", "log_mcp_input", "log_mcp_output", "log_error")
+    # Langfuse SDK按需导入，结果缓存在类上（None表示尚未尝试导入，False表示不可用）
+    _langfuse_cls = None
+    
+    def __init__(self, enabled: bool = True, langfuse_enabled: bool = False, max_logs: Optional[int] = None):
         self.enabled = enabled
-        self.langfuse_enabled = langfuse_enabled and LANGFUSE_AVAILABLE
-        self.logs = []
-        self.current_session_id = None
+        self.langfuse_enabled = False
+        self.langfuse = None
+        self.logs = deque(maxlen=max_logs or self.MAX_LOGS)
+        # 按日志类型索引，避免按类型过滤时扫描全部日志
+        self._logs_by_type: Dict[str, deque] = defaultdict(deque)
+        # 按会话ID索引日志，并维护会话元信息（开始/结束时间、日志条数）
+        self._logs_by_session: Dict[str, deque] = {}
+        self._session_meta: Dict[str, SessionMeta] = {}
+        # 每个会话内各类型日志的计数
+        self._session_type_counts: Dict[str, Counter] = {}
+        # 当前会话ID按asyncio任务隔离（保存在模块级的_SESSION_IDS中），并发处理多个查询时互不覆盖
+        self._session_key = next(_manager_keys)
+        # 日志全局递增序号，作为增量读取的游标（不受旧日志淘汰影响）
+        self._seq = 0
+        # 缓存当前秒的ISO时间字符串，同一秒内的日志只需拼接微秒部分
+        self._ts_sec = 0
+        self._ts_str = ""
+        # Langfuse上报队列及后台发送任务，首次上报时在当前事件循环中创建
+        self._lf_q: Optional[asyncio.Queue] = None
+        self._lf_task: Optional[asyncio.Task] = None
+        # Langfuse SDK为阻塞调用，使用独立线程池避免占用默认执行器
+        self._lf_pool: Optional[ThreadPoolExecutor] = None
         
-        if self.langfuse_enabled:
+        if langfuse_enabled:
+            langfuse_cls = self._load_langfuse()
+            if langfuse_cls:
+                try:
+                    self.langfuse = langfuse_cls()
+                    self.langfuse_enabled = True
+                except Exception as e:
+                    logger.warning(f"无法初始化Langfuse: {e}")
+                    
+    @classmethod
+    def _load_langfuse(cls):
+        """导入Langfuse类，只在首次启用Langfuse时导入一次"""
+        if cls._langfuse_cls is None:
             try:
-                self.langfuse = Langfuse()
-            except Exception as e:
-                logger.warning(f"无法初始化Langfuse: {e}")
-                self.langfuse_enabled = False
-                self.langfuse = None
+                from langfuse import Langfuse
+                DebugManager._langfuse_cls = Langfuse
+            except ImportError:
+                DebugManager._langfuse_cls = False
+        return cls._langfuse_cls
+            
+    @property
+    def enabled(self) -> bool:
+        """是否记录调试日志"""
+        return self._enabled
+        
+    @enabled.setter
+    def enabled(self, enabled: bool):
+        # 禁用时用实例属性遮蔽记录方法，调用方无需每次检查开关
+        self._enabled = bool(enabled)
+        for name in self._LOG_METHODS:
+            if self._enabled:
+                self.__dict__.pop(name, None)
+            else:
+                setattr(self, name, self._noop)
+                
+    @staticmethod
+    def _noop(*args, **kwargs):
+        """禁用调试时的空操作"""
+        
+    @property
+    def current_session_id(self) -> Optional[str]:
+        """当前任务上下文中的会话ID"""
+        return _SESSION_IDS.get().get(self._session_key)
+        
+    @current_session_id.setter
+    def current_session_id(self, session_id: Optional[str]):
+        session_ids = dict(_SESSION_IDS.get())
+        if session_id is None:
+            session_ids.pop(self._session_key, None)
         else:
-            self.langfuse = None
+            session_ids[self._session_key] = session_id
+        _SESSION_IDS.set(session_ids)
+            
+    def _now_iso(self) -> str:
+        """返回当前本地时间的ISO-8601字符串（精确到微秒）"""
+        t = time.time()
+        sec = int(t)
+        if sec != self._ts_sec:
+            self._ts_sec = sec
+            self._ts_str = datetime.fromtimestamp(sec).isoformat()
+        return "%s.%06d" % (self._ts_str, int((t - sec) * 1_000_000))
             
     def start_new_session(self) -> str:
         """开始新的调试会话，返回会话ID"""
-        self.current_session_id = str(uuid.uuid4())
-        return self.current_session_id
+        session_id = uuid.uuid4().hex
+        self.current_session_id = session_id
+        return session_id
         
     def set_session(self, session_id: str):
         """设置当前会话ID"""
@@ -44,168 +149,298 @@ class DebugManager:
             
     def log_llm_input(self, prompt: str, context: Any = None):
         """记录发送给LLM的输入"""
-        if not self.enabled:
-            return
-            
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self._now_iso(),
             "type": "llm_input",
             "prompt": prompt,
             "context": context,
             "session_id": self.current_session_id
         }
         
-        self.logs.append(log_entry)
-        logger.debug(f"LLM输入: {prompt[:100]}...")
+        self._record(log_entry)
+        logger.debug("LLM输入: %.100s...", prompt)
         
         if self.langfuse_enabled and self.langfuse:
-            try:
-                self.langfuse.trace(
-                    name="llm_input",
-                    input={
-                        "prompt": prompt,
-                        "context": context
-                    }
-                )
-            except Exception as e:
-                logger.warning(f"Langfuse记录失败: {e}")
+            self._trace(
+                name="llm_input",
+                input={
+                    "prompt": prompt,
+                    "context": context
+                }
+            )
                 
     def log_llm_output(self, output: str):
         """记录LLM的输出"""
-        if not self.enabled:
-            return
-            
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self._now_iso(),
             "type": "llm_output",
             "output": output,
             "session_id": self.current_session_id
         }
         
-        self.logs.append(log_entry)
-        logger.debug(f"LLM输出: {output[:100]}...")
+        self._record(log_entry)
+        logger.debug("LLM输出: %.100s...", output)
         
         if self.langfuse_enabled and self.langfuse:
-            try:
-                self.langfuse.trace(
-                    name="llm_output",
-                    output=output
-                )
-            except Exception as e:
-                logger.warning(f"Langfuse记录失败: {e}")
+            self._trace(
+                name="llm_output",
+                output=output
+            )
                 
     def log_mcp_input(self, tool_name: str, parameters: Dict[str, Any]):
         """记录发送给MCP的输入"""
-        if not self.enabled:
-            return
-            
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self._now_iso(),
             "type": "mcp_input",
             "tool_name": tool_name,
             "parameters": parameters,
             "session_id": self.current_session_id
         }
         
-        self.logs.append(log_entry)
-        logger.debug(f"MCP输入 - 工具: {tool_name}, 参数: {parameters}")
+        self._record(log_entry)
+        logger.debug("MCP输入 - 工具: %s, 参数: %s", tool_name, parameters)
         
         if self.langfuse_enabled and self.langfuse:
-            try:
-                self.langfuse.trace(
-                    name=f"mcp_input_{tool_name}",
-                    input=parameters
-                )
-            except Exception as e:
-                logger.warning(f"Langfuse记录失败: {e}")
+            self._trace(
+                name=f"mcp_input_{tool_name}",
+                input=parameters
+            )
                 
     def log_mcp_output(self, tool_name: str, output: Dict[str, Any]):
         """记录MCP的输出"""
-        if not self.enabled:
-            return
-            
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self._now_iso(),
             "type": "mcp_output",
             "tool_name": tool_name,
             "output": output,
             "session_id": self.current_session_id
         }
         
-        self.logs.append(log_entry)
-        logger.debug(f"MCP输出 - 工具: {tool_name}, 结果: {output}")
+        self._record(log_entry)
+        logger.debug("MCP输出 - 工具: %s, 结果: %s", tool_name, output)
         
         if self.langfuse_enabled and self.langfuse:
-            try:
-                self.langfuse.trace(
-                    name=f"mcp_output_{tool_name}",
-                    output=output
-                )
-            except Exception as e:
-                logger.warning(f"Langfuse记录失败: {e}")
+            self._trace(
+                name=f"mcp_output_{tool_name}",
+                output=output
+            )
                 
     def log_error(self, error: Exception):
         """记录错误"""
-        if not self.enabled:
-            return
-            
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self._now_iso(),
             "type": "error",
             "error": str(error),
             "error_type": type(error).__name__,
             "session_id": self.current_session_id
         }
         
-        self.logs.append(log_entry)
-        logger.error(f"错误: {error}")
+        self._record(log_entry)
+        logger.error("错误: %s", error)
         
         if self.langfuse_enabled and self.langfuse:
+            self._trace(
+                name="error",
+                input=str(error)
+            )
+                
+    def _trace(self, **kwargs):
+        """上报Langfuse事件，运行在事件循环中时入队由后台任务批量发送"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有事件循环时直接同步发送
+            self._send_traces([kwargs])
+            return
+            
+        if self._lf_task is None or self._lf_task.done() or self._lf_task.get_loop() is not loop:
+            self._lf_q = asyncio.Queue()
+            self._lf_task = loop.create_task(self._lf_drain(self._lf_q))
+        self._lf_q.put_nowait(kwargs)
+        
+    def _get_lf_pool(self) -> ThreadPoolExecutor:
+        """获取（必要时创建）Langfuse专用线程池"""
+        if self._lf_pool is None:
+            self._lf_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="langfuse")
+        return self._lf_pool
+        
+    async def _lf_drain(self, queue: asyncio.Queue):
+        """后台任务：批量取出事件并在线程池中调用阻塞的Langfuse SDK"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.LANGFUSE_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
             try:
-                self.langfuse.trace(
-                    name="error",
-                    input=str(error)
-                )
+                await loop.run_in_executor(self._get_lf_pool(), self._send_traces, batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+                    
+    def _send_traces(self, batch: List[Dict[str, Any]]):
+        """逐条发送Langfuse事件"""
+        for kwargs in batch:
+            try:
+                self.langfuse.trace(**kwargs)
             except Exception as e:
                 logger.warning(f"Langfuse记录失败: {e}")
                 
-    def get_logs(self, session_id: str = None) -> List[Dict[str, Any]]:
-        """获取所有日志，可选择按会话ID过滤"""
+    async def aclose(self):
+        """等待排队中的Langfuse事件发送完毕并刷新SDK缓冲"""
+        task, queue = self._lf_task, self._lf_q
+        self._lf_task = self._lf_q = None
+        if task is not None and not task.done():
+            if task.get_loop() is asyncio.get_running_loop():
+                await queue.join()
+            task.cancel()
+            
+        flush = getattr(self.langfuse, "flush", None)
+        if flush is not None:
+            try:
+                await asyncio.get_running_loop().run_in_executor(self._get_lf_pool(), flush)
+            except Exception as e:
+                logger.warning(f"Langfuse刷新失败: {e}")
+                
+        if self._lf_pool is not None:
+            self._lf_pool.shutdown(wait=False)
+            self._lf_pool = None
+                
+    def _record(self, log_entry: Dict[str, Any]):
+        """追加日志并维护索引，日志已满时同步淘汰最旧日志的索引"""
+        if len(self.logs) == self.logs.maxlen:
+            self._evict(self.logs[0])
+        self._seq += 1
+        log_entry["seq"] = self._seq
+        self.logs.append(log_entry)
+        self._logs_by_type[log_entry["type"]].append(log_entry)
+        
+        session_id = log_entry.get("session_id")
+        if session_id:
+            timestamp = log_entry["timestamp"]
+            session_logs = self._logs_by_session.get(session_id)
+            if session_logs is None:
+                session_logs = self._logs_by_session[session_id] = deque()
+                self._session_meta[session_id] = SessionMeta(session_id, timestamp, timestamp, 0)
+                self._session_type_counts[session_id] = Counter()
+            session_logs.append(log_entry)
+            meta = self._session_meta[session_id]
+            meta.log_count += 1
+            meta.end_time = timestamp
+            self._session_type_counts[session_id][log_entry["type"]] += 1
+        
+    def _evict(self, log_entry: Dict[str, Any]):
+        """从索引中移除即将被淘汰的日志"""
+        log_type = log_entry["type"]
+        type_logs = self._logs_by_type.get(log_type)
+        if type_logs:
+            # 同类型日志按时间顺序追加，被淘汰的一定是最左侧的那条
+            type_logs.popleft()
+            if not type_logs:
+                del self._logs_by_type[log_type]
+                
+        session_id = log_entry.get("session_id")
+        session_logs = self._logs_by_session.get(session_id) if session_id else None
+        if session_logs:
+            session_logs.popleft()
+            if session_logs:
+                meta = self._session_meta[session_id]
+                meta.log_count -= 1
+                meta.start_time = session_logs[0]["timestamp"]
+                self._session_type_counts[session_id][log_type] -= 1
+            else:
+                del self._logs_by_session[session_id]
+                del self._session_meta[session_id]
+                del self._session_type_counts[session_id]
+            
+    def get_logs(self, session_id: str = None, since: Optional[int] = None,
+                 limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取日志（按时间顺序），可按会话ID过滤
+        
+        给出since（包括0）时返回序号大于since的最早limit条（便于按最后序号继续翻页，不会漏掉日志）；
+        只给出limit时返回最近的limit条。
+        """
+        source = self._logs_by_session.get(session_id, ()) if session_id else self.logs
+        if since is None and limit is None:
+            return list(source)
+        tail = []
+        for entry in reversed(source):
+            if since is not None:
+                if entry["seq"] <= since:
+                    break
+            elif len(tail) >= limit:
+                break
+            tail.append(entry)
+        tail.reverse()
+        if since is not None and limit is not None:
+            del tail[limit:]
+        return tail
+        
+    def get_logs_since(self, session_id: str, since: int = 0) -> List[Dict[str, Any]]:
+        """获取会话中序号大于since的日志（按时间顺序），用于增量推送"""
+        session_logs = self._logs_by_session.get(session_id)
+        if not session_logs:
+            return []
+        new_logs = []
+        for entry in reversed(session_logs):
+            if entry["seq"] <= since:
+                break
+            new_logs.append(entry)
+        new_logs.reverse()
+        return new_logs
+        
+    def get_by_type(self, log_type: str) -> List[Dict[str, Any]]:
+        """获取指定类型的日志"""
+        return list(self._logs_by_type.get(log_type, ()))
+        
+    def count_by_type(self, log_type: str, session_id: str = None) -> int:
+        """统计指定类型的日志条数，可选择只统计某个会话"""
         if session_id:
-            return [log for log in self.logs if log.get("session_id") == session_id]
-        return self.logs.copy()
+            counts = self._session_type_counts.get(session_id)
+            return counts[log_type] if counts else 0
+        type_logs = self._logs_by_type.get(log_type)
+        return len(type_logs) if type_logs else 0
         
     def get_sessions(self) -> List[Dict[str, Any]]:
         """获取所有会话信息"""
-        sessions = {}
-        for log in self.logs:
-            session_id = log.get("session_id")
-            if session_id and session_id not in sessions:
-                sessions[session_id] = {
-                    "session_id": session_id,
-                    "start_time": log.get("timestamp"),
-                    "log_count": 0
-                }
-            if session_id:
-                sessions[session_id]["log_count"] += 1
-                
-        # 更新每个会话的结束时间
-        for log in reversed(self.logs):
-            session_id = log.get("session_id")
-            if session_id and "end_time" not in sessions[session_id]:
-                sessions[session_id]["end_time"] = log.get("timestamp")
-                
-        return list(sessions.values())
+        return [meta.to_dict() for meta in self._session_meta.values()]
+        
+    def set_max_logs(self, max_logs: int):
+        """调整日志容量，缩小时淘汰最旧的日志"""
+        if max_logs <= 0:
+            raise ValueError("max_logs必须为正整数")
+        while len(self.logs) > max_logs:
+            self._evict(self.logs.popleft())
+        self.logs = deque(self.logs, maxlen=max_logs)
         
     def clear_logs(self):
         """清空日志"""
         self.logs.clear()
+        self._logs_by_type.clear()
+        self._logs_by_session.clear()
+        self._session_meta.clear()
+        self._session_type_counts.clear()
         
     def save_logs(self, filepath: str):
-        """保存日志到文件"""
+        """保存日志到文件（JSON数组，逐条写入，不在内存中拼接整个文件）"""
+        try:
+            with open(filepath, 'wb') as f:
+                f.write(b"[\n")
+                for i, entry in enumerate(self.logs):
+                    if i:
+                        f.write(b",\n")
+                    f.write(json_utils.dumps_bytes(entry))
+                f.write(b"\n]\n")
+            logger.info(f"日志已保存到 {filepath}")
+        except Exception as e:
+            logger.error(f"保存日志失败: {e}")
+            
+    def save_logs_jsonl(self, filepath: str):
+        """保存日志到JSON Lines文件，每行一条日志，便于下游流式读取"""
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(self.logs, f, ensure_ascii=False, indent=2)
+            with open(filepath, 'wb') as f:
+                for entry in self.logs:
+                    f.write(json_utils.dumps_bytes(entry))
+                    f.write(b"\n")
             logger.info(f"日志已保存到 {filepath}")
         except Exception as e:
-            logger.error(f"保存日志失败: {e}")
\ No newline at end of file
+            logger.error(f"保存日志失败: {e}")
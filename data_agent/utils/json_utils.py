@@ -0,0 +1,38 @@
+"""
+JSON序列化工具
+优先使用orjson，不可用时回退到标准库json
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """解析JSON字符串或字节"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode("utf-8")
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """序列化为UTF-8编码的JSON字节，无法序列化的对象转为字符串"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=str, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None, default=str).encode("utf-8")
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """序列化为JSON字符串"""
+    return dumps_bytes(obj, indent).decode("utf-8")
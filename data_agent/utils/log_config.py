@@ -0,0 +1,21 @@
+"""
+日志配置
+各入口脚本统一通过setup_logging配置根日志，进程内只生效一次
+"""
+
+import logging
+from typing import Optional
+
+# 带时间和模块名的日志格式
+DETAILED_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_CONFIGURED = False
+
+
+def setup_logging(level: int = logging.INFO, fmt: Optional[str] = None):
+    """配置根日志，重复调用时直接返回"""
+    global _CONFIGURED
+    if _CONFIGURED:
+        return
+    logging.basicConfig(level=level, format=fmt or logging.BASIC_FORMAT)
+    _CONFIGURED = True
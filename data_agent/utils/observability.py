@@ -1,34 +1,127 @@
+import functools
+import os
+import types
+from typing import Any, Dict, Mapping, Optional
+
 from opentelemetry import trace, metrics
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import ConsoleSpanExporter, BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ParentBasedTraceIdRatio
 from opentelemetry.sdk.metrics import MeterProvider
 from opentelemetry.sdk.metrics.export import ConsoleMetricExporter, PeriodicExportingMetricReader
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+
+def _otlp_exporter_classes():
+    """按 OTEL_EXPORTER_OTLP_PROTOCOL 选择OTLP导出器，默认HTTP（设置为grpc时使用gRPC）"""
+    if os.getenv("OTEL_EXPORTER_OTLP_PROTOCOL", "http/protobuf") == "grpc":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+    return OTLPSpanExporter, OTLPMetricExporter
+
+@functools.lru_cache(maxsize=128)
+def _qt_attrs(query_type: str) -> Mapping[str, str]:
+    """查询类型指标属性（按取值缓存，只读）"""
+    return types.MappingProxyType({"query_type": query_type})
+
+@functools.lru_cache(maxsize=128)
+def _llm_attrs(model: str) -> Mapping[str, str]:
+    """LLM模型指标属性（按取值缓存，只读）"""
+    return types.MappingProxyType({"model": model})
+
+@functools.lru_cache(maxsize=128)
+def _mcp_attrs(tool: str) -> Mapping[str, str]:
+    """MCP工具指标属性（按取值缓存，只读）"""
+    return types.MappingProxyType({"tool": tool})
 
 class ObservabilityManager:
     """可观察性管理器"""
     
-    def __init__(self, service_name: str = "data-analysis-agent"):
+    __slots__ = ("_initialized", "service_name", "tracer", "meter",
+                 "query_counter", "llm_call_counter", "mcp_call_counter")
+    
+    # BatchSpanProcessor默认参数，可被 OTEL_BSP_* 环境变量或 tracing_config 覆盖
+    DEFAULT_TRACING_CONFIG = {
+        "max_queue_size": 4096,
+        "schedule_delay_millis": 1000,
+        "max_export_batch_size": 256,
+        "export_timeout_millis": 10000,
+    }
+    
+    # 默认追踪采样率，可通过 OTEL_TRACES_SAMPLER_ARG 覆盖
+    DEFAULT_SAMPLE_RATIO = 0.1
+    
+    # 参数对应的OpenTelemetry标准环境变量
+    TRACING_CONFIG_ENV = {
+        "max_queue_size": "OTEL_BSP_MAX_QUEUE_SIZE",
+        "schedule_delay_millis": "OTEL_BSP_SCHEDULE_DELAY",
+        "max_export_batch_size": "OTEL_BSP_MAX_EXPORT_BATCH_SIZE",
+        "export_timeout_millis": "OTEL_BSP_EXPORT_TIMEOUT",
+    }
+    
+    # 按service_name缓存的实例，重复创建时返回同一个管理器
+    _instances: Dict[str, "ObservabilityManager"] = {}
+    
+    def __new__(cls, service_name: str = "data-analysis-agent", tracing_config: Optional[Dict[str, Any]] = None):
+        instance = cls._instances.get(service_name)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance._initialized = False
+            cls._instances[service_name] = instance
+        return instance
+    
+    def __init__(self, service_name: str = "data-analysis-agent", tracing_config: Optional[Dict[str, Any]] = None):
+        # 已初始化的实例直接复用（再次传入的tracing_config不生效）
+        if self._initialized:
+            return
+        self._initialized = True
         self.service_name = service_name
-        self._setup_tracing()
+        self._setup_tracing(tracing_config)
         self._setup_metrics()
     
-    def _setup_tracing(self):
+    @staticmethod
+    def _console_export_enabled() -> bool:
+        """是否启用控制台导出器（设置 DEBUG_TRACES=1 时）"""
+        return os.getenv("DEBUG_TRACES") == "1"
+    
+    def _resolve_tracing_config(self, tracing_config: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """合并BatchSpanProcessor参数，优先级：tracing_config > 环境变量 > 默认值"""
+        resolved = dict(self.DEFAULT_TRACING_CONFIG)
+        for key, env_name in self.TRACING_CONFIG_ENV.items():
+            value = os.getenv(env_name)
+            if value:
+                resolved[key] = int(value)
+        if tracing_config:
+            resolved.update(tracing_config)
+        return resolved
+    
+    def _setup_tracing(self, tracing_config: Optional[Dict[str, Any]] = None):
         """设置追踪"""
-        tracer_provider = TracerProvider()
+        # 全局已注册SDK TracerProvider时直接复用，避免重复添加处理器和导出线程
+        if isinstance(trace.get_tracer_provider(), TracerProvider):
+            self.tracer = trace.get_tracer(self.service_name)
+            return
         
-        # 控制台输出（开发环境）
-        console_exporter = ConsoleSpanExporter()
-        tracer_provider.add_span_processor(
-            BatchSpanProcessor(console_exporter)
-        )
+        # 按trace ID头部采样，未采样的span为NonRecordingSpan，不进入批处理队列；
+        # 指标计数（record_*）与采样无关，不受影响
+        sample_ratio = float(os.getenv("OTEL_TRACES_SAMPLER_ARG", self.DEFAULT_SAMPLE_RATIO))
+        tracer_provider = TracerProvider(sampler=ParentBasedTraceIdRatio(sample_ratio))
+        processor_config = self._resolve_tracing_config(tracing_config)
+        
+        # 控制台输出（仅调试时开启，避免生产环境逐条序列化并写stdout）
+        if self._console_export_enabled():
+            console_exporter = ConsoleSpanExporter()
+            tracer_provider.add_span_processor(
+                BatchSpanProcessor(console_exporter, **processor_config)
+            )
         
         # OTLP导出器（生产环境）
         try:
-            otlp_exporter = OTLPSpanExporter()
+            span_exporter_cls, _ = _otlp_exporter_classes()
+            otlp_exporter = span_exporter_cls()
             tracer_provider.add_span_processor(
-                BatchSpanProcessor(otlp_exporter)
+                BatchSpanProcessor(otlp_exporter, **processor_config)
             )
         except Exception:
             pass  # OTLP不可用时忽略
@@ -38,10 +131,18 @@ class ObservabilityManager:
     
     def _setup_metrics(self):
         """设置指标"""
-        # 创建指标读取器
-        reader = PeriodicExportingMetricReader(ConsoleMetricExporter())
-        meter_provider = MeterProvider(metric_readers=[reader])
-        metrics.set_meter_provider(meter_provider)
+        # 全局已注册SDK MeterProvider时直接复用
+        if not isinstance(metrics.get_meter_provider(), MeterProvider):
+            # 创建指标读取器，控制台输出同样仅在调试时开启
+            readers = []
+            if self._console_export_enabled():
+                readers.append(PeriodicExportingMetricReader(ConsoleMetricExporter()))
+            try:
+                _, metric_exporter_cls = _otlp_exporter_classes()
+                readers.append(PeriodicExportingMetricReader(metric_exporter_cls()))
+            except Exception:
+                pass  # OTLP不可用时忽略
+            metrics.set_meter_provider(MeterProvider(metric_readers=readers))
         self.meter = metrics.get_meter(self.service_name)
         
         # 定义指标
@@ -62,12 +163,12 @@ class ObservabilityManager:
     
     def record_query(self, query_type: str = "unknown"):
         """记录查询"""
-        self.query_counter.add(1, {"query_type": query_type})
+        self.query_counter.add(1, _qt_attrs(query_type))
     
     def record_llm_call(self, model: str = "unknown"):
         """记录LLM调用"""
-        self.llm_call_counter.add(1, {"model": model})
+        self.llm_call_counter.add(1, _llm_attrs(model))
     
     def record_mcp_call(self, tool: str = "unknown"):
         """记录MCP调用"""
-        self.mcp_call_counter.add(1, {"tool": tool})
\ No newline at end of file
+        self.mcp_call_counter.add(1, _mcp_attrs(tool))
\ No newline at end of file
@@ -1,51 +1,82 @@
+try:
+    from opentelemetry import metrics, trace
+    OTEL_API_AVAILABLE = True
+except ImportError:
+    metrics = trace = None
+    OTEL_API_AVAILABLE = False
+
+
+class _NoopSpan:
+    """无操作的span"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class _NoopCounter:
+    """无操作的计数器"""
+    __slots__ = ()
+
+    def add(self, value, attributes=None):
+        pass  # 什么都不做
+
+
+# 共享的无操作实例，调用时直接返回，不再每次创建对象
+_NOOP_SPAN = _NoopSpan()
+_NOOP_COUNTER = _NoopCounter()
+
+
+class _NoopTracer:
+    """无操作的tracer"""
+    __slots__ = ()
+
+    def start_as_current_span(self, name, *args, **kwargs):
+        return _NOOP_SPAN
+
+
+class _NoopMeter:
+    """无操作的meter"""
+    __slots__ = ()
+
+    def create_counter(self, name, description=""):
+        return _NOOP_COUNTER
+
+
+# 安装了OpenTelemetry API时使用官方的无操作实现，否则使用上面的简化版本
+if OTEL_API_AVAILABLE:
+    _NOOP_TRACER = trace.NoOpTracer()
+    _NOOP_METER = metrics.NoOpMeter("noop")
+else:
+    _NOOP_TRACER = _NoopTracer()
+    _NOOP_METER = _NoopMeter()
+
+
 class ObservabilityManager:
     """禁用的可观察性管理器"""
-    
-    def __init__(self, service_name: str = "data-analysis-agent"):
+
+    def __init__(self, service_name: str = "data-analysis-agent", tracing_config=None):
         self.service_name = service_name
         # 初始化空的tracer和meter
-        self.tracer = self._create_noop_tracer()
-        self.meter = self._create_noop_meter()
-        
+        self.tracer = _NOOP_TRACER
+        self.meter = _NOOP_METER
+
         # 初始化空的计数器
-        self.query_counter = self._create_noop_counter()
-        self.llm_call_counter = self._create_noop_counter()
-        self.mcp_call_counter = self._create_noop_counter()
-    
-    def _create_noop_tracer(self):
-        """创建无操作的tracer"""
-        class NoopTracer:
-            def start_as_current_span(self, name, *args, **kwargs):
-                class NoopSpan:
-                    def __enter__(self):
-                        return self
-                    def __exit__(self, *args):
-                        pass
-                return NoopSpan()
-        return NoopTracer()
-    
-    def _create_noop_meter(self):
-        """创建无操作的meter"""
-        class NoopMeter:
-            def create_counter(self, name, description=""):
-                return self._create_noop_counter()
-        return NoopMeter()
-    
-    def _create_noop_counter(self):
-        """创建无操作的计数器"""
-        class NoopCounter:
-            def add(self, value, attributes=None):
-                pass  # 什么都不做
-        return NoopCounter()
-    
+        self.query_counter = self.meter.create_counter("queries_processed", description="处理的查询数量")
+        self.llm_call_counter = self.meter.create_counter("llm_calls", description="LLM调用次数")
+        self.mcp_call_counter = self.meter.create_counter("mcp_calls", description="MCP调用次数")
+
     def record_query(self, query_type: str = "unknown"):
         """记录查询（无操作）"""
         pass
-    
+
     def record_llm_call(self, model: str = "unknown"):
         """记录LLM调用（无操作）"""
         pass
-    
+
     def record_mcp_call(self, tool: str = "unknown"):
         """记录MCP调用（无操作）"""
-        pass
\ No newline at end of file
+        pass
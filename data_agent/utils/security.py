@@ -1,16 +1,42 @@
+import base64
 import hashlib
 import hmac
-from typing import Optional
+import os
+import time
+from functools import lru_cache
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional, Union
 from cryptography.fernet import Fernet
-from datetime import datetime, timedelta
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from datetime import datetime
+
+# 预先初始化的SHA256对象，每次哈希时copy()，省去重新创建和初始化摘要上下文的开销
+_SHA256_PROTO = hashlib.sha256()
+
+@lru_cache(maxsize=64)
+def _encode_secret(secret: str) -> bytes:
+    """缓存密钥的UTF-8编码，同一密钥签名/验签时不再重复编码"""
+    return secret.encode()
 
 class SecurityManager:
     """安全管理器"""
     
-    def __init__(self, encryption_key: Optional[str] = None):
+    # 速率限制的统计窗口（秒）
+    RATE_LIMIT_WINDOW = 60
+    
+    def __init__(self, encryption_key: Optional[str] = None, max_log_entries: int = 100_000, aead: bool = False):
         self.encryption_key = encryption_key or Fernet.generate_key()
         self.cipher = Fernet(self.encryption_key)
-        self.access_log = []
+        # 可选的AES-GCM通道：单遍加密+认证，无base64开销，密钥由Fernet密钥派生
+        self._aead = AESGCM(self._derive_aead_key(self.encryption_key)) if aead else None
+        # 访问日志只保留最近的 max_log_entries 条，防止长期运行时内存无限增长
+        self.access_log = deque(maxlen=max_log_entries)
+        # 每个用户最近访问的时间戳（epoch秒），用于速率限制，避免扫描完整访问日志
+        self._user_hits: Dict[str, Deque[float]] = defaultdict(deque)
+        # 上次清理空闲用户的时间
+        self._last_hits_sweep = 0.0
     
     def encrypt_data(self, data: str) -> str:
         """加密数据"""
@@ -20,21 +46,53 @@ class SecurityManager:
         """解密数据"""
         return self.cipher.decrypt(encrypted_data.encode()).decode()
     
+    @staticmethod
+    def _derive_aead_key(encryption_key) -> bytes:
+        """用HKDF从Fernet密钥派生独立的256位AES-GCM密钥"""
+        if isinstance(encryption_key, str):
+            encryption_key = encryption_key.encode()
+        return HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b"data-agent-aesgcm"
+        ).derive(base64.urlsafe_b64decode(encryption_key))
+    
+    def encrypt_data_fast(self, data: bytes) -> bytes:
+        """AES-GCM加密，返回 nonce(12字节) + 密文"""
+        if self._aead is None:
+            raise RuntimeError("未启用AES-GCM，请使用 SecurityManager(aead=True)")
+        nonce = os.urandom(12)
+        return nonce + self._aead.encrypt(nonce, data, None)
+    
+    def decrypt_data_fast(self, encrypted_data: bytes) -> bytes:
+        """AES-GCM解密 encrypt_data_fast 的输出"""
+        if self._aead is None:
+            raise RuntimeError("未启用AES-GCM，请使用 SecurityManager(aead=True)")
+        return self._aead.decrypt(encrypted_data[:12], encrypted_data[12:], None)
+    
     def hash_data(self, data: str) -> str:
         """数据哈希"""
-        return hashlib.sha256(data.encode()).hexdigest()
+        h = _SHA256_PROTO.copy()
+        h.update(data.encode())
+        return h.hexdigest()
     
-    def generate_signature(self, data: str, secret: str) -> str:
-        """生成签名"""
-        return hmac.new(
-            secret.encode(),
-            data.encode(),
-            hashlib.sha256
-        ).hexdigest()
+    def generate_signature(self, data: Union[str, bytes], secret: Union[str, bytes]) -> str:
+        """生成签名，data和secret可以直接传入已编码的bytes"""
+        if not isinstance(data, (bytes, bytearray)):
+            data = data.encode()
+        if not isinstance(secret, (bytes, bytearray)):
+            secret = _encode_secret(secret)
+        return hmac.new(secret, data, hashlib.sha256).hexdigest()
     
-    def verify_signature(self, data: str, signature: str, secret: str) -> bool:
+    def verify_signature(self, data: Union[str, bytes], signature: Union[str, bytes], secret: Union[str, bytes]) -> bool:
         """验证签名"""
+        # SHA256十六进制签名固定为64个字符，长度不符时无需计算
+        if len(signature) != 64:
+            return False
         expected_signature = self.generate_signature(data, secret)
+        if isinstance(signature, (bytes, bytearray)):
+            return hmac.compare_digest(signature, expected_signature.encode())
         return hmac.compare_digest(signature, expected_signature)
     
     def log_access(self, user_id: str, action: str, resource: str):
@@ -45,13 +103,32 @@ class SecurityManager:
             "action": action,
             "resource": resource
         })
+        now = time.time()
+        cutoff = now - self.RATE_LIMIT_WINDOW
+        hits = self._user_hits[user_id]
+        # 记录时同时淘汰窗口外的访问，未被检查速率的用户也不会无限累积
+        while hits and hits[0] <= cutoff:
+            hits.popleft()
+        hits.append(now)
+        
+        # 每个窗口最多扫描一次全部用户，移除窗口内没有访问的空闲用户
+        if now - self._last_hits_sweep >= self.RATE_LIMIT_WINDOW:
+            self._last_hits_sweep = now
+            idle_users = [uid for uid, user_hits in self._user_hits.items()
+                          if not user_hits or user_hits[-1] <= cutoff]
+            for uid in idle_users:
+                del self._user_hits[uid]
     
     def check_rate_limit(self, user_id: str, max_requests: int = 100) -> bool:
-        """检查速率限制"""
-        now = datetime.now()
-        recent_access = [
-            log for log in self.access_log
-            if log["user_id"] == user_id and
-            datetime.fromisoformat(log["timestamp"]) > now - timedelta(minutes=1)
-        ]
-        return len(recent_access) < max_requests
\ No newline at end of file
+        """检查速率限制（最近一分钟内的访问次数）"""
+        hits = self._user_hits.get(user_id)
+        if not hits:
+            return 0 < max_requests
+        
+        # 淘汰一分钟之前的访问记录
+        cutoff = time.time() - self.RATE_LIMIT_WINDOW
+        while hits and hits[0] <= cutoff:
+            hits.popleft()
+        if not hits:
+            del self._user_hits[user_id]
+        return len(hits) < max_requests
@@ -0,0 +1,10 @@
+"""
+文本处理工具
+"""
+
+
+def truncate(text: str, limit: int = 200, suffix: str = "...") -> str:
+    """截断过长的文本，超出limit个字符时保留前limit个字符并追加suffix"""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}{suffix}"
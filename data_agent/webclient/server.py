@@ -5,28 +5,171 @@ Web服务后端
 """
 
 import asyncio
+import contextvars
+import functools
+import gzip
+import hashlib
 import os
+import secrets
 import sys
-from typing import Dict, Any
-import json
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple
 import logging
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from aiohttp import web, WSMsgType
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    uvloop = None
+    UVLOOP_AVAILABLE = False
 from data_agent.agent import DataAnalysisAgent, AgentConfig
+from data_agent.demand_network_agent import DemandNetworkAgentConfig, DemandNetworkAnalysisAgent
+from data_agent.utils import json_utils
+from data_agent.utils.log_config import setup_logging
 
 # 配置日志
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# 预先序列化的常用空响应
+_EMPTY_LOGS_JSON = json_utils.dumps_bytes({"logs": [], "status": "success"})
+_EMPTY_SESSIONS_JSON = json_utils.dumps_bytes({"sessions": [], "status": "success"})
+
+# 固定结构响应的预编码片段，请求时只拼接可变部分
+_HEALTH_PREFIX = b'{"status":"healthy","service":"data-analysis-agent-web","timestamp":'
+_ERROR_PREFIX = b'{"error":'
+_ERROR_SUFFIX = b',"status":"error"}'
+
+# 上传文件时每次读取的块大小
+UPLOAD_CHUNK_SIZE = 1 << 20
+# 小于该字节数的上传文件会把全部内容返回给客户端（随后由chat传给Agent）
+UPLOAD_CONTENT_MAX_BYTES = 1024 * 1024
+# 聊天消息中文件内容预览的字符数
+UPLOAD_PREVIEW_CHARS = 500
+# HTTP Keep-Alive空闲连接保持时间（秒）
+KEEPALIVE_TIMEOUT = 75
+
+# 超过该字节数的JSON响应启用gzip压缩（由compress_middleware统一处理）
+COMPRESS_MIN_SIZE = 1024
+
+@web.middleware
+async def compress_middleware(request, handler):
+    """客户端支持gzip时压缩较大的JSON响应，并设置Vary头"""
+    response = await handler(request)
+    if (isinstance(response, web.Response)
+            and response.content_type == 'application/json'
+            and 'Content-Encoding' not in response.headers
+            and isinstance(response.body, (bytes, bytearray))
+            and len(response.body) > COMPRESS_MIN_SIZE):
+        response.headers['Vary'] = 'Accept-Encoding'
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response.enable_compression(web.ContentCoding.gzip)
+    return response
+
+def _json(data: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    """使用json_utils序列化的JSON响应"""
+    return _prebuilt_json(json_utils.dumps_bytes(data), status, headers)
+
+def _prebuilt_json(body: bytes, status: int = 200,
+                   headers: Optional[Dict[str, str]] = None) -> web.Response:
+    """用预先序列化的JSON字节构建响应"""
+    return web.Response(body=body, status=status, content_type='application/json', headers=headers)
+
+def _json_error(message: str, status: int = 500) -> web.Response:
+    """{"error": message, "status": "error"} 形式的错误响应"""
+    return _prebuilt_json(_ERROR_PREFIX + json_utils.dumps_bytes(message) + _ERROR_SUFFIX, status)
+
+def _query_int(request, name: str, default: Optional[int]) -> Optional[int]:
+    """解析非负整数查询参数，缺省时返回default"""
+    value = request.query.get(name)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise ValueError(f"参数{name}必须为非负整数")
+    return number
+
+def _query_fields(request) -> Optional[Set[str]]:
+    """解析 fields=a,b,c 查询参数，未提供时返回None（返回全部字段）"""
+    if 'fields' not in request.query:
+        return None
+    return {field for field in request.query['fields'].split(',') if field}
+
+def _project(items: List[Dict[str, Any]], fields: Optional[Set[str]]) -> List[Dict[str, Any]]:
+    """只保留指定字段"""
+    if fields is None:
+        return items
+    return [{k: v for k, v in item.items() if k in fields} for item in items]
+
 class WebService:
     """Web服务类"""
     
-    def __init__(self):
-        self.app = web.Application()
+    # 预加载页面的浏览器缓存策略（配合ETag，页面更新后重启服务即失效）
+    PAGE_CACHE_CONTROL = 'public, max-age=3600'
+    
+    # 调试日志/会话接口默认返回的条数（limit=0表示不限制）；日志带since时返回其后最早的条目以便继续翻页
+    DEBUG_DEFAULT_LIMIT = 200
+    
+    # 状态接口的浏览器缓存策略（配合ETag，MCP服务器信息变更后失效）
+    STATUS_CACHE_CONTROL = 'public, max-age=5'
+    
+    # WebSocket文本响应超过该长度（字符数）时分块发送
+    WS_CHUNK_SIZE = 4096
+    
+    # WebSocket查询批处理：收集查询的时间窗口（秒）和单批最大查询数
+    CHAT_BATCH_WINDOW = 0.01
+    CHAT_BATCH_MAX = 8
+    
+    # 每个WebSocket连接待发送消息队列的容量，以及单帧最多合并的消息数；
+    # 只合并较小的消息，合并后的帧不超过WS_CHUNK_SIZE，分块消息始终单独成帧
+    WS_QUEUE_SIZE = 256
+    WS_BATCH_MAX = 16
+    
+    # 启动时预加载的静态页面：页面名 -> 文件名
+    STATIC_PAGES = {
+        'index': 'index.html',
+        'debug_monitor': 'debug_monitor.html',
+    }
+    
+    def __init__(self, hot_reload: Optional[bool] = None):
+        self.app = web.Application(
+            middlewares=[compress_middleware],
+            handler_args={'keepalive_timeout': KEEPALIVE_TIMEOUT}
+        )
         self.agent = None
+        # 需求网络分析Agent，首次使用时创建
+        self.demand_network_agent = None
+        # 开发热重载模式：每次请求直接发送磁盘上的页面文件（sendfile），不使用预加载内容
+        if hot_reload is None:
+            hot_reload = os.getenv("WEB_HOT_RELOAD") == "1"
+        self.hot_reload = hot_reload
+        # Agent初始化锁，在事件循环中首次使用时创建
+        self._init_lock: Optional[asyncio.Lock] = None
+        self._dn_init_lock: Optional[asyncio.Lock] = None
+        # WebSocket查询批处理队列及其后台任务，首次使用时创建
+        self._chat_queue: Optional[asyncio.Queue] = None
+        self._chat_batcher: Optional[asyncio.Future] = None
+        self._chat_batches: Set[asyncio.Future] = set()
+        # 预加载的页面内容，文件不存在时为None
+        self._pages: Optional[Dict[str, Optional[bytes]]] = None
+        # 预压缩的gzip页面内容
+        self._pages_gz: Dict[str, bytes] = {}
+        # 预加载页面的ETag
+        self._page_etags: Dict[str, str] = {}
+        # 本进程的ETag前缀，服务重启后旧ETag全部失效
+        self._etag_salt = secrets.token_hex(4)
+        # 已序列化的调试日志条目：日志序号 -> JSON字节，序号全局递增且清空日志后不重置
+        self._log_json_cache: Dict[int, bytes] = {}
+        # 上传文件目录，在启动时创建一次
+        self.upload_dir = os.path.join(os.path.dirname(__file__), 'uploads')
+        self._upload_dir_ready = False
         
     def setup_routes(self):
         """设置路由"""
@@ -47,6 +190,12 @@ class WebService:
         
         # WebSocket路由
         self.app.router.add_get('/api/ws', self.websocket_handler)
+        
+        # 静态资源目录（存在时注册），由aiohttp内置的sendfile静态处理器提供服务；
+        # 只暴露static子目录，避免把服务端源码当作静态文件
+        static_dir = os.path.join(os.path.dirname(__file__), 'static')
+        if os.path.isdir(static_dir):
+            self.app.router.add_static('/static/', static_dir, chunk_size=256 * 1024)
     
     async def initialize_agent(self):
         """初始化数据分析Agent"""
@@ -62,79 +211,315 @@ class WebService:
             logger.error(f"初始化数据分析Agent失败: {e}")
             self.agent = None
     
+    def _load_static(self):
+        """一次性读取静态页面到内存，避免每次请求都在事件循环中读磁盘"""
+        base_dir = os.path.dirname(__file__)
+        pages = {}
+        for name, filename in self.STATIC_PAGES.items():
+            path = os.path.join(base_dir, filename)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    pages[name] = f.read()
+            else:
+                pages[name] = None
+        self._pages = pages
+        self._pages_gz = {
+            name: gzip.compress(body, 9)
+            for name, body in pages.items() if body is not None
+        }
+        self._page_etags = {
+            name: '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+            for name, body in pages.items() if body is not None
+        }
+    
+    def _prepare_upload_dir(self):
+        """创建上传文件目录"""
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self._upload_dir_ready = True
+    
+    async def _load_static_files(self):
+        """在线程池中预加载页面并创建上传目录，避免阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._load_static)
+        await loop.run_in_executor(None, self._prepare_upload_dir)
+    
+    async def _page_response(self, request, name: str, fallback_text: str) -> web.Response:
+        """返回预加载的页面，客户端支持时返回预压缩的gzip版本"""
+        loop = asyncio.get_running_loop()
+        if self.hot_reload:
+            path = os.path.join(os.path.dirname(__file__), self.STATIC_PAGES[name])
+            if await loop.run_in_executor(None, os.path.exists, path):
+                return web.FileResponse(
+                    path,
+                    chunk_size=256 * 1024,
+                    headers={'Content-Type': 'text/html; charset=utf-8'}
+                )
+            return web.Response(text=fallback_text, content_type='text/plain')
+        
+        if self._pages is None:
+            await loop.run_in_executor(None, self._load_static)
+        body = self._pages.get(name)
+        if body is None:
+            return web.Response(text=fallback_text, content_type='text/plain')
+        
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag = self._page_etags[name]
+        if use_gzip:
+            # 压缩与未压缩内容是不同的表示，使用不同的ETag
+            etag = etag[:-1] + '-gz"'
+        headers = {
+            'Vary': 'Accept-Encoding',
+            'ETag': etag,
+            'Cache-Control': self.PAGE_CACHE_CONTROL
+        }
+        if etag in request.headers.get('If-None-Match', ''):
+            return web.Response(status=304, headers=headers)
+        
+        if use_gzip:
+            body = self._pages_gz[name]
+            headers['Content-Encoding'] = 'gzip'
+        return web.Response(body=body, content_type='text/html', charset='utf-8', headers=headers)
+    
+    def _log_fragments(self, logs: List[Dict[str, Any]]) -> List[bytes]:
+        """返回日志条目的JSON片段，已序列化过的条目直接复用缓存"""
+        cache = self._log_json_cache
+        fragments = []
+        for entry in logs:
+            fragment = cache.get(entry["seq"])
+            if fragment is None:
+                fragment = cache[entry["seq"]] = json_utils.dumps_bytes(entry)
+            fragments.append(fragment)
+        
+        # 缓存超过日志容量时丢弃已被淘汰日志的片段
+        all_logs = self.agent.debug_manager.logs
+        if len(cache) > all_logs.maxlen:
+            oldest = all_logs[0]["seq"] if all_logs else float("inf")
+            self._log_json_cache = {seq: frag for seq, frag in cache.items() if seq >= oldest}
+        return fragments
+    
+    def _logs_json(self, logs: List[Dict[str, Any]], **fields: Any) -> bytes:
+        """拼接缓存的日志片段和其余字段，生成 {"logs": [...], ...} 响应体"""
+        parts = [b'{"logs":[', b','.join(self._log_fragments(logs)), b']']
+        for key, value in fields.items():
+            parts.append(b',"%s":%s' % (key.encode(), json_utils.dumps_bytes(value)))
+        parts.append(b'}')
+        return b''.join(parts)
+    
+    def _query_logs(self, request, session_id: Optional[str] = None) -> web.Response:
+        """按 limit/since/fields 查询参数返回调试日志"""
+        limit = _query_int(request, 'limit', self.DEBUG_DEFAULT_LIMIT) or None
+        since = _query_int(request, 'since', None)
+        fields = _query_fields(request)
+        logs = self.agent.debug_manager.get_logs(session_id, since=since, limit=limit)
+        
+        # 日志序号单调递增且只淘汰最旧的日志，首末序号即可标识日志列表内容（同一URL下）；
+        # 序号在进程重启后从1开始，加上本进程的前缀避免命中重启前的缓存
+        first, last = (logs[0]["seq"], logs[-1]["seq"]) if logs else (0, 0)
+        etag = 'W/"%s-%d-%d"' % (self._etag_salt, first, last)
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers=headers)
+        
+        extra = {"session_id": session_id} if session_id else {}
+        if fields is not None:
+            # 只返回部分字段时无法复用整条日志的序列化缓存
+            return _json({"logs": _project(logs, fields), **extra, "status": "success"}, headers=headers)
+        return _prebuilt_json(self._logs_json(logs, **extra, status="success"), headers=headers)
+    
+    def _status_etag(self, kind: str) -> str:
+        """状态接口的ETag，由MCP服务器信息版本号和Agent配置组成"""
+        agent = self.agent
+        mcp_version = agent.mcp_client.version if agent.mcp_client else -1
+        config = agent.config
+        return 'W/"%s-%s-%d-%d-%s-%d"' % (
+            self._etag_salt, kind, mcp_version,
+            config.debug_mode, config.default_llm, config.langfuse_enabled
+        )
+    
+    async def _ensure_agent(self) -> bool:
+        """确保Agent已初始化，并发请求只会触发一次初始化"""
+        if self.agent:
+            return True
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if not self.agent:
+                await self.initialize_agent()
+        return self.agent is not None
+    
+    async def _get_dn_agent(self):
+        """获取需求网络分析Agent，首次使用时创建，并发请求只会创建一次"""
+        if self.demand_network_agent is not None:
+            return self.demand_network_agent
+        if self._dn_init_lock is None:
+            self._dn_init_lock = asyncio.Lock()
+        async with self._dn_init_lock:
+            if self.demand_network_agent is None:
+                config = DemandNetworkAgentConfig(
+                    debug_mode=self.agent.config.debug_mode,
+                    langfuse_enabled=self.agent.config.langfuse_enabled,
+                    default_llm=self.agent.config.default_llm
+                )
+                self.demand_network_agent = DemandNetworkAnalysisAgent(config)
+        return self.demand_network_agent
+    
+    async def _submit_query(self, agent, message: str, session_id: Optional[str]) -> Tuple[Any, Optional[str]]:
+        """把查询放入批处理队列并等待结果，返回 (响应, 会话ID)"""
+        if self._chat_queue is None:
+            self._chat_queue = asyncio.Queue()
+            self._chat_batcher = asyncio.ensure_future(self._chat_batch_loop())
+        future = asyncio.get_running_loop().create_future()
+        # 查询在提交者的上下文中执行，保留当前会话等上下文变量
+        await self._chat_queue.put((agent, message, session_id, contextvars.copy_context(), future))
+        return await future
+    
+    async def _chat_batch_loop(self):
+        """后台任务：收集时间窗口内到达的查询，成批并发执行，不等待上一批完成"""
+        loop = asyncio.get_running_loop()
+        queue = self._chat_queue
+        while True:
+            items = [await queue.get()]
+            deadline = loop.time() + self.CHAT_BATCH_WINDOW
+            while len(items) < self.CHAT_BATCH_MAX:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            batch = asyncio.ensure_future(self._run_query_batch(items))
+            self._chat_batches.add(batch)
+            batch.add_done_callback(self._chat_batches.discard)
+            batch.add_done_callback(functools.partial(self._cancel_unfinished, items))
+    
+    async def _run_query_batch(self, items: List[Tuple[Any, str, Optional[str], contextvars.Context, asyncio.Future]]):
+        """并发执行一批查询，结果写回各自的future"""
+        tasks = [
+            ctx.run(asyncio.ensure_future, self._query_with_session(agent, message, session_id))
+            for agent, message, session_id, ctx, _ in items
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for (*_, future), result in zip(items, results):
+            if future.done():
+                # 提交者已取消等待
+                continue
+            if isinstance(result, asyncio.CancelledError):
+                future.cancel()
+            elif isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    @staticmethod
+    def _cancel_unfinished(items, _batch=None):
+        """批次结束（包括被取消）后，取消仍未得到结果的future，避免提交者一直等待"""
+        for *_, future in items:
+            if not future.done():
+                future.cancel()
+    
+    async def _close_agents(self):
+        """关闭已创建的Agent，发送完排队中的调试追踪事件"""
+        for agent in (self.agent, self.demand_network_agent):
+            if agent is not None:
+                try:
+                    await agent.aclose()
+                except Exception as e:
+                    logger.warning("关闭Agent时出错: %s", e)
+    
+    async def _query_with_session(self, agent, message: str, session_id: Optional[str]) -> Tuple[Any, Optional[str]]:
+        """执行查询，并在同一上下文中读取查询后的当前会话ID"""
+        response = await agent.process_query(message)
+        # 会话ID保存在处理本次查询的Agent自己的调试管理器上
+        debug_manager = getattr(agent, 'debug_manager', None)
+        if debug_manager:
+            session_id = debug_manager.current_session_id
+        return response, session_id
+    
+    async def _close_chat_batcher(self):
+        """停止查询批处理后台任务，取消执行中的批次和仍在排队的查询"""
+        if self._chat_batcher is not None:
+            self._chat_batcher.cancel()
+            self._chat_batcher = None
+        
+        # 执行中的批次被取消后，其中各查询的future由_cancel_unfinished取消
+        batches = list(self._chat_batches)
+        for batch in batches:
+            batch.cancel()
+        if batches:
+            await asyncio.gather(*batches, return_exceptions=True)
+        
+        # 仍在排队的查询直接取消，避免提交者一直等待
+        queue = self._chat_queue
+        self._chat_queue = None
+        while queue is not None and not queue.empty():
+            *_, future = queue.get_nowait()
+            if not future.done():
+                future.cancel()
+    
     async def index(self, request):
         """主页"""
-        # 读取并返回index.html
-        index_path = os.path.join(os.path.dirname(__file__), 'index.html')
-        if os.path.exists(index_path):
-            with open(index_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return web.Response(text=content, content_type='text/html')
-        else:
-            return web.Response(text="Welcome to Data Analysis Agent API", content_type='text/plain')
+        return await self._page_response(request, 'index', "Welcome to Data Analysis Agent API")
     
     async def debug_monitor(self, request):
         """调试监控页面"""
-        # 读取并返回debug_monitor.html
-        debug_path = os.path.join(os.path.dirname(__file__), 'debug_monitor.html')
-        if os.path.exists(debug_path):
-            with open(debug_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return web.Response(text=content, content_type='text/html')
-        else:
-            return web.Response(text="Debug monitor page not found", content_type='text/plain')
+        return await self._page_response(request, 'debug_monitor', "Debug monitor page not found")
     
     async def health_check(self, request):
         """健康检查"""
-        return web.json_response({
-            "status": "healthy",
-            "service": "data-analysis-agent-web",
-            "timestamp": asyncio.get_event_loop().time()
-        })
+        return _prebuilt_json(_HEALTH_PREFIX + repr(time.time()).encode() + b'}')
     
     async def system_status(self, request):
         """系统状态检查"""
         try:
-            if not self.agent:
-                await self.initialize_agent()
-                if not self.agent:
-                    return web.json_response({
-                        "status": "error",
-                        "message": "Agent初始化失败"
-                    }, status=500)
+            if not await self._ensure_agent():
+                return _json({
+                    "status": "error",
+                    "message": "Agent初始化失败"
+                }, status=500)
+            
+            etag = self._status_etag('status')
+            headers = {'ETag': etag, 'Cache-Control': self.STATUS_CACHE_CONTROL}
+            if request.headers.get('If-None-Match') == etag:
+                return web.Response(status=304, headers=headers)
+            
+            agent = self.agent
+            config = agent.config
+            mcp_client = agent.mcp_client
             
             # 检查Agent组件状态
             status_info = {
                 "status": "running",
                 "components": {
                     "agent": "initialized",
-                    "mcp_client": "available" if self.agent.mcp_client else "unavailable",
-                    "llm_manager": "available" if self.agent.llm_manager else "unavailable",
-                    "debug_manager": "available" if self.agent.debug_manager else "unavailable",
-                    "prompt_manager": "available" if self.agent.prompt_manager else "unavailable"
+                    "mcp_client": "available" if mcp_client else "unavailable",
+                    "llm_manager": "available" if agent.llm_manager else "unavailable",
+                    "debug_manager": "available" if agent.debug_manager else "unavailable",
+                    "prompt_manager": "available" if agent.prompt_manager else "unavailable"
                 },
                 "configuration": {
-                    "debug_mode": self.agent.config.debug_mode,
-                    "default_llm": self.agent.config.default_llm,
-                    "langfuse_enabled": self.agent.config.langfuse_enabled
+                    "debug_mode": config.debug_mode,
+                    "default_llm": config.default_llm,
+                    "langfuse_enabled": config.langfuse_enabled
                 }
             }
             
             # 如果MCP客户端可用，检查服务器状态
-            if self.agent.mcp_client:
-                status_info["mcp_servers"] = {}
-                for server_name, server_info in self.agent.mcp_client.server_info.items():
-                    status_info["mcp_servers"][server_name] = {
+            if mcp_client:
+                status_info["mcp_servers"] = {
+                    server_name: {
                         "url": server_info.get("url"),
                         "healthy": server_info.get("healthy", False),
                         "instructions": server_info.get("instructions", "")
                     }
+                    for server_name, server_info in mcp_client.server_info.items()
+                }
             
-            return web.json_response(status_info)
+            return _json(status_info, headers=headers)
             
         except Exception as e:
             logger.error(f"获取系统状态时出错: {e}")
-            return web.json_response({
+            return _json({
                 "status": "error",
                 "message": str(e)
             }, status=500)
@@ -142,47 +527,52 @@ class WebService:
     async def mcp_status(self, request):
         """MCP状态检查"""
         try:
-            if not self.agent:
-                await self.initialize_agent()
-                if not self.agent:
-                    return web.json_response({
-                        "status": "error",
-                        "message": "Agent初始化失败"
-                    }, status=500)
+            if not await self._ensure_agent():
+                return _json({
+                    "status": "error",
+                    "message": "Agent初始化失败"
+                }, status=500)
             
-            if not self.agent.mcp_client:
-                return web.json_response({
+            mcp_client = self.agent.mcp_client
+            if not mcp_client:
+                return _json({
                     "status": "error",
                     "message": "MCP客户端未初始化"
                 }, status=500)
             
-            # 获取MCP服务器状态
-            mcp_status = {
-                "status": "success",
-                "servers": {},
-                "available_tools": self.agent.mcp_client.get_available_tools()
-            }
+            etag = self._status_etag('mcp')
+            headers = {'ETag': etag, 'Cache-Control': self.STATUS_CACHE_CONTROL}
+            if request.headers.get('If-None-Match') == etag:
+                return web.Response(status=304, headers=headers)
             
-            for server_name, server_info in self.agent.mcp_client.server_info.items():
-                mcp_status["servers"][server_name] = {
+            # 获取MCP服务器状态
+            available_tools = mcp_client.get_available_tools()
+            servers = {
+                server_name: {
                     "url": server_info.get("url"),
                     "healthy": server_info.get("healthy", False),
                     "instructions": server_info.get("instructions", ""),
                     "tools": []  # 可以扩展为从服务器动态获取工具列表
                 }
-            
-            # 统计信息
-            mcp_status["summary"] = {
-                "total_servers": len(mcp_status["servers"]),
-                "healthy_servers": len([s for s in mcp_status["servers"].values() if s["healthy"]]),
-                "available_tools": len(mcp_status["available_tools"])
+                for server_name, server_info in mcp_client.server_info.items()
+            }
+            mcp_status = {
+                "status": "success",
+                "servers": servers,
+                "available_tools": available_tools,
+                # 统计信息
+                "summary": {
+                    "total_servers": len(servers),
+                    "healthy_servers": sum(1 for s in servers.values() if s["healthy"]),
+                    "available_tools": len(available_tools)
+                }
             }
             
-            return web.json_response(mcp_status)
+            return _json(mcp_status, headers=headers)
             
         except Exception as e:
             logger.error(f"获取MCP状态时出错: {e}")
-            return web.json_response({
+            return _json({
                 "status": "error",
                 "message": str(e)
             }, status=500)
@@ -191,89 +581,66 @@ class WebService:
         """获取调试日志"""
         try:
             if not self.agent or not self.agent.debug_manager:
-                return web.json_response({
-                    "logs": [],
-                    "status": "success"
-                })
+                return _prebuilt_json(_EMPTY_LOGS_JSON)
             
-            logs = self.agent.debug_manager.get_logs()
-            return web.json_response({
-                "logs": logs,
-                "status": "success"
-            })
+            return self._query_logs(request)
+        except ValueError as e:
+            return _json_error(str(e), 400)
         except Exception as e:
             logger.error(f"获取调试日志时出错: {e}")
-            return web.json_response({
-                "error": str(e),
-                "status": "error"
-            }, status=500)
+            return _json_error(str(e), 500)
             
     async def get_debug_logs_by_session(self, request):
         """按会话ID获取调试日志"""
         try:
             session_id = request.match_info.get('session_id')
             if not session_id:
-                return web.json_response({
-                    "error": "缺少会话ID",
-                    "status": "error"
-                }, status=400)
+                return _json_error("缺少会话ID", 400)
                 
             if not self.agent or not self.agent.debug_manager:
-                return web.json_response({
-                    "logs": [],
-                    "status": "success"
-                })
+                return _prebuilt_json(_EMPTY_LOGS_JSON)
             
-            logs = self.agent.debug_manager.get_logs(session_id)
-            return web.json_response({
-                "logs": logs,
-                "session_id": session_id,
-                "status": "success"
-            })
+            return self._query_logs(request, session_id)
+        except ValueError as e:
+            return _json_error(str(e), 400)
         except Exception as e:
             logger.error(f"按会话ID获取调试日志时出错: {e}")
-            return web.json_response({
-                "error": str(e),
-                "status": "error"
-            }, status=500)
+            return _json_error(str(e), 500)
             
     async def get_debug_sessions(self, request):
         """获取所有调试会话"""
         try:
             if not self.agent or not self.agent.debug_manager:
-                return web.json_response({
-                    "sessions": [],
-                    "status": "success"
-                })
+                return _prebuilt_json(_EMPTY_SESSIONS_JSON)
             
+            limit = _query_int(request, 'limit', self.DEBUG_DEFAULT_LIMIT)
             sessions = self.agent.debug_manager.get_sessions()
-            return web.json_response({
-                "sessions": sessions,
+            if limit and len(sessions) > limit:
+                sessions = sessions[-limit:]
+            return _json({
+                "sessions": _project(sessions, _query_fields(request)),
                 "status": "success"
             })
+        except ValueError as e:
+            return _json_error(str(e), 400)
         except Exception as e:
             logger.error(f"获取调试会话时出错: {e}")
-            return web.json_response({
-                "error": str(e),
-                "status": "error"
-            }, status=500)
+            return _json_error(str(e), 500)
     
     async def clear_debug_logs(self, request):
         """清空调试日志"""
         try:
             if self.agent and self.agent.debug_manager:
                 self.agent.debug_manager.clear_logs()
+            self._log_json_cache.clear()
             
-            return web.json_response({
+            return _json({
                 "message": "调试日志已清空",
                 "status": "success"
             })
         except Exception as e:
             logger.error(f"清空调试日志时出错: {e}")
-            return web.json_response({
-                "error": str(e),
-                "status": "error"
-            }, status=500)
+            return _json_error(str(e), 500)
     
     async def upload_file(self, request):
         """处理文件上传"""
@@ -284,9 +651,10 @@ class WebService:
             # 存储文件内容和元数据
             uploaded_files = []
             
-            # 创建临时目录存储上传的文件
-            upload_dir = os.path.join(os.path.dirname(__file__), 'uploads')
-            os.makedirs(upload_dir, exist_ok=True)
+            loop = asyncio.get_running_loop()
+            # 上传目录通常已在启动时创建
+            if not self._upload_dir_ready:
+                await loop.run_in_executor(None, self._prepare_upload_dir)
             
             # 处理每个上传的文件
             while True:
@@ -300,26 +668,30 @@ class WebService:
                         continue
                         
                     # 生成安全的文件名
-                    import uuid
-                    safe_filename = f"{uuid.uuid4()}_{filename}"
-                    file_path = os.path.join(upload_dir, safe_filename)
+                    safe_filename = secrets.token_hex(8) + '_' + filename
+                    file_path = os.path.join(self.upload_dir, safe_filename)
                     
-                    # 保存文件
-                    with open(file_path, 'wb') as f:
+                    # 保存文件：按1MiB分块读取，磁盘写入放到线程池中执行，边写边统计大小
+                    f = await loop.run_in_executor(None, open, file_path, 'wb')
+                    file_size = 0
+                    content = bytearray()
+                    try:
                         while True:
-                            chunk = await part.read_chunk()
+                            chunk = await part.read_chunk(UPLOAD_CHUNK_SIZE)
                             if not chunk:
                                 break
-                            f.write(chunk)
-                    
-                    # 获取文件信息
-                    file_size = os.path.getsize(file_path)
+                            file_size += len(chunk)
+                            # 写入时顺便保留小文件的内容，避免写完后再读一遍文件
+                            if len(content) < UPLOAD_CONTENT_MAX_BYTES:
+                                content += chunk[:UPLOAD_CONTENT_MAX_BYTES - len(content)]
+                            await loop.run_in_executor(None, f.write, chunk)
+                    finally:
+                        await loop.run_in_executor(None, f.close)
                     
-                    # 读取文件内容（仅对小文件）
+                    # 读取文件内容（仅对小于1MB的文件）
                     file_content = None
-                    if file_size < 1024 * 1024:  # 小于1MB的文件读取内容
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            file_content = f.read()
+                    if file_size < UPLOAD_CONTENT_MAX_BYTES:
+                        file_content = content.decode('utf-8', errors='ignore')
                     
                     uploaded_files.append({
                         "filename": filename,
@@ -329,7 +701,7 @@ class WebService:
                         "content": file_content
                     })
             
-            return web.json_response({
+            return _json({
                 "message": f"成功上传 {len(uploaded_files)} 个文件",
                 "files": uploaded_files,
                 "status": "success"
@@ -337,31 +709,26 @@ class WebService:
             
         except Exception as e:
             logger.error(f"处理文件上传时出错: {e}")
-            return web.json_response({
-                "error": str(e),
-                "status": "error"
-            }, status=500)
+            return _json_error(str(e), 500)
     
     async def chat(self, request):
         """处理聊天请求"""
         try:
             # 解析请求数据
-            data = await request.json()
+            data = json_utils.loads(await request.read())
             message = data.get('message', '')
             files = data.get('files', [])
             agent_type = data.get('agent', 'main')  # 获取请求的Agent类型
             
             if not message and not files:
-                return web.json_response({
+                return _json({
                     "error": "消息或文件不能为空"
                 }, status=400)
             
-            if not self.agent:
-                await self.initialize_agent()
-                if not self.agent:
-                    return web.json_response({
-                        "error": "Agent初始化失败"
-                    }, status=500)
+            if not await self._ensure_agent():
+                return _json({
+                    "error": "Agent初始化失败"
+                }, status=500)
             
             # 如果有上传的文件，将文件信息添加到消息中
             if files:
@@ -369,7 +736,7 @@ class WebService:
                 for file in files:
                     file_info += f"- 文件名: {file['filename']}\n"
                     if file.get('content'):
-                        file_info += f"  文件内容预览: {file['content'][:500]}...\n"
+                        file_info += f"  文件内容预览: {file['content'][:UPLOAD_PREVIEW_CHARS]}...\n"
                     else:
                         file_info += f"  文件路径: {file['file_path']}\n"
                 
@@ -383,33 +750,96 @@ class WebService:
                 response = await self.agent.process_query(message, files=files)
             elif agent_type == 'demand-network':
                 # 创建或使用需求网络分析Agent
-                if not hasattr(self, 'demand_network_agent') or self.demand_network_agent is None:
-                    # 创建需求网络分析Agent
-                    from data_agent.demand_network_agent import DemandNetworkAgentConfig, DemandNetworkAnalysisAgent
-                    config = DemandNetworkAgentConfig(
-                        debug_mode=self.agent.config.debug_mode,
-                        langfuse_enabled=self.agent.config.langfuse_enabled,
-                        default_llm=self.agent.config.default_llm
-                    )
-                    self.demand_network_agent = DemandNetworkAnalysisAgent(config)
-                
-                # 使用需求网络分析Agent处理
-                response = await self.demand_network_agent.process_query(message, files=files)
+                dn_agent = await self._get_dn_agent()
+                response = await dn_agent.process_query(message, files=files)
             else:
                 # 默认使用主Agent处理
                 response = await self.agent.process_query(message, files=files)
             
-            return web.json_response({
+            return _json({
                 "response": response,
                 "status": "success"
             })
             
         except Exception as e:
             logger.error(f"处理聊天请求时出错: {e}")
-            return web.json_response({
-                "error": str(e),
-                "status": "error"
-            }, status=500)
+            return _json_error(str(e), 500)
+    
+    @staticmethod
+    async def _ws_send(queue: asyncio.Queue, payload: Any):
+        """把消息（字典或已序列化的JSON字符串）放入连接的发送队列，队列满时等待发送协程消费"""
+        await queue.put(payload)
+    
+    def _ws_frames(self, batch: List[Any]) -> List[str]:
+        """把消息分组为帧：相邻的小消息合并为JSON数组，分块消息和较大的消息单独成帧"""
+        frames = []
+        group: List[str] = []
+        group_size = 0
+        
+        def flush():
+            if group:
+                # 只有一条消息时保持原来的单对象格式
+                frames.append(group[0] if len(group) == 1 else '[' + ','.join(group) + ']')
+                group.clear()
+        
+        for item in batch:
+            text = item if isinstance(item, str) else json_utils.dumps(item)
+            standalone = isinstance(item, dict) and item.get("type") == "chunk"
+            if standalone or len(text) > self.WS_CHUNK_SIZE:
+                flush()
+                group_size = 0
+                frames.append(text)
+                continue
+            if group_size + len(text) > self.WS_CHUNK_SIZE:
+                flush()
+                group_size = 0
+            group.append(text)
+            group_size += len(text) + 1
+        flush()
+        return frames
+    
+    async def _ws_pump(self, ws: web.WebSocketResponse, queue: asyncio.Queue):
+        """发送协程：把队列中已积压的小消息合并为JSON数组文本帧发送，收到None时退出"""
+        while True:
+            batch = [await queue.get()]
+            while batch[-1] is not None and len(batch) < self.WS_BATCH_MAX:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            stop = batch[-1] is None
+            if stop:
+                batch.pop()
+            if batch and not ws.closed:
+                try:
+                    for frame in self._ws_frames(batch):
+                        await ws.send_str(frame)
+                except ConnectionError as e:
+                    logger.warning("WebSocket发送失败: %s", e)
+            if stop:
+                return
+    
+    async def _ws_send_response(self, queue: asyncio.Queue, response: Any, session_id: Optional[str]):
+        """发送查询结果；较长的文本结果分块发送，最后发送结束消息"""
+        if not isinstance(response, str) or len(response) <= self.WS_CHUNK_SIZE:
+            await self._ws_send(queue, {
+                "response": response,
+                "session_id": session_id,
+                "status": "success"
+            })
+            return
+        
+        for start in range(0, len(response), self.WS_CHUNK_SIZE):
+            await self._ws_send(queue, {
+                "type": "chunk",
+                "data": response[start:start + self.WS_CHUNK_SIZE],
+                "session_id": session_id
+            })
+        await self._ws_send(queue, {
+            "type": "end",
+            "session_id": session_id,
+            "status": "success"
+        })
     
     async def websocket_handler(self, request):
         """WebSocket处理函数"""
@@ -417,9 +847,27 @@ class WebService:
         await ws.prepare(request)
         
         # 初始化Agent（如果还没有）
-        if not self.agent:
-            await self.initialize_agent()
+        await self._ensure_agent()
+        
+        # (调试管理器, 会话) 已推送到本连接的最后一条调试日志序号
+        log_cursors: Dict[Tuple[int, str], int] = {}
         
+        # 本连接的发送队列和发送协程
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.WS_QUEUE_SIZE)
+        sender = asyncio.ensure_future(self._ws_pump(ws, queue))
+        try:
+            await self._ws_receive_loop(ws, queue, log_cursors)
+        finally:
+            # 通知发送协程发完剩余消息后退出
+            if not sender.done():
+                await self._ws_send(queue, None)
+                await sender
+        
+        return ws
+    
+    async def _ws_receive_loop(self, ws: web.WebSocketResponse, queue: asyncio.Queue,
+                               log_cursors: Dict[Tuple[int, str], int]):
+        """读取WebSocket消息并处理查询"""
         async for msg in ws:
             if msg.type == WSMsgType.TEXT:
                 if msg.data == 'close':
@@ -427,7 +875,7 @@ class WebService:
                 else:
                     try:
                         # 解析消息
-                        data = json.loads(msg.data)
+                        data = json_utils.loads(msg.data)
                         message = data.get('message', '')
                         
                         if message and self.agent:
@@ -442,77 +890,78 @@ class WebService:
                                 # 否则开始新会话
                                 session_id = self.agent.enhanced_memory.start_session()
                             
-                            # 根据请求的Agent类型处理消息
-                            if agent_type == 'main':
-                                # 使用主Agent处理
-                                response = await self.agent.process_query(message)
-                            elif agent_type == 'demand-network':
+                            # 根据请求的Agent类型选择Agent，默认使用主Agent
+                            if agent_type == 'demand-network':
                                 # 创建或使用需求网络分析Agent
-                                if not hasattr(self, 'demand_network_agent') or self.demand_network_agent is None:
-                                    # 创建需求网络分析Agent
-                                    from data_agent.demand_network_agent import DemandNetworkAgentConfig, DemandNetworkAnalysisAgent
-                                    config = DemandNetworkAgentConfig(
-                                        debug_mode=self.agent.config.debug_mode,
-                                        langfuse_enabled=self.agent.config.langfuse_enabled,
-                                        default_llm=self.agent.config.default_llm
-                                    )
-                                    self.demand_network_agent = DemandNetworkAnalysisAgent(config)
-                                
-                                # 使用需求网络分析Agent处理
-                                response = await self.demand_network_agent.process_query(message)
+                                agent = await self._get_dn_agent()
                             else:
-                                # 默认使用主Agent处理
-                                response = await self.agent.process_query(message)
+                                agent = self.agent
                             
-                            # 获取当前会话ID
-                            session_id = self.agent.debug_manager.current_session_id if self.agent.debug_manager else session_id
+                            # 查询经批处理队列与同一时间窗口内的其他查询并发执行，并返回当前会话ID
+                            response, session_id = await self._submit_query(agent, message, session_id)
                             
                             # 发送响应，包含会话ID
-                            await ws.send_json({
-                                "response": response,
-                                "session_id": session_id,
-                                "status": "success"
-                            })
+                            await self._ws_send_response(queue, response, session_id)
                             
-                            # 发送当前会话的调试日志
-                            if self.agent.debug_manager and session_id:
-                                session_logs = self.agent.debug_manager.get_logs(session_id)
+                            # 只发送当前会话中尚未推送过的调试日志（日志记录在处理本次查询的Agent上，
+                            # 各Agent的日志序号相互独立，游标按调试管理器区分）
+                            debug_manager = getattr(agent, 'debug_manager', None)
+                            if debug_manager and session_id:
+                                cursor_key = (id(debug_manager), session_id)
+                                session_logs = debug_manager.get_logs_since(
+                                    session_id, log_cursors.get(cursor_key, 0)
+                                )
                                 if session_logs:
-                                    await ws.send_json({
-                                        "debug_logs": session_logs,
-                                        "session_id": session_id,
-                                        "type": "debug_update",
-                                        "status": "success"
-                                    })
+                                    log_cursors[cursor_key] = session_logs[-1]["seq"]
+                                    if debug_manager is self.agent.debug_manager:
+                                        fragments = b','.join(self._log_fragments(session_logs)).decode()
+                                    else:
+                                        # 序列化缓存按主Agent的日志序号索引，其他Agent的日志直接序列化
+                                        fragments = ','.join(json_utils.dumps(entry) for entry in session_logs)
+                                    await self._ws_send(queue, '{"debug_logs":[%s],"session_id":%s,"type":"debug_update","status":"success"}' % (
+                                        fragments, json_utils.dumps(session_id)
+                                    ))
                         else:
-                            await ws.send_json({
+                            await self._ws_send(queue, {
                                 "error": "消息为空或Agent未初始化",
                                 "status": "error"
                             })
                     except Exception as e:
                         logger.error(f"处理WebSocket消息时出错: {e}")
-                        await ws.send_json({
+                        await self._ws_send(queue, {
                             "error": str(e),
                             "status": "error"
                         })
             elif msg.type == WSMsgType.ERROR:
                 logger.error(f'WebSocket连接错误: {ws.exception()}')
-        
-        return ws
     
     def run(self, host='localhost', port=8084):
         """启动Web服务"""
         # 设置路由
         self.setup_routes()
         
-        # 初始化Agent
+        # 初始化Agent并预加载静态页面
         async def init_agent(app):
+            await self._load_static_files()
             await self.initialize_agent()
         
+        async def close_batcher(app):
+            await self._close_chat_batcher()
+        
+        async def close_agents(app):
+            await self._close_agents()
+        
         self.app.on_startup.append(init_agent)
+        self.app.on_cleanup.append(close_batcher)
+        self.app.on_cleanup.append(close_agents)
+        
+        # 安装了uvloop时使用基于libuv的事件循环
+        if UVLOOP_AVAILABLE:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
         
-        # 启动服务
-        web.run_app(self.app, host=host, port=port)
+        # 启动服务；访问日志默认关闭，设置 WEB_ACCESS_LOG=1 时开启
+        access_log = logging.getLogger('aiohttp.access') if os.getenv("WEB_ACCESS_LOG") == "1" else None
+        web.run_app(self.app, host=host, port=port, access_log=access_log)
 
 def main():
     """主函数"""
@@ -5,46 +5,49 @@
 
 import asyncio
 import aiohttp
-import json
+
+async def _fetch_json(session: aiohttp.ClientSession, method: str, url: str, **kwargs):
+    """发送请求并解析JSON响应"""
+    async with session.request(method, url, **kwargs) as resp:
+        return await resp.json()
 
 async def test_debug_api():
     """测试调试API端点"""
     base_url = "http://localhost:8082"
-    
-    async with aiohttp.ClientSession() as session:
-        # 测试健康检查
-        try:
-            async with session.get(f"{base_url}/api/health") as resp:
-                health_data = await resp.json()
-                print("健康检查:", health_data)
-        except Exception as e:
-            print("健康检查失败:", e)
+
+    # 调试日志可能很大，调大读缓冲区
+    connector = aiohttp.TCPConnector(limit=16)
+    async with aiohttp.ClientSession(connector=connector, read_bufsize=10 * 1024 * 1024) as session:
+        # 健康检查、调试日志和聊天消息互不依赖，并发发送
+        chat_data = {"message": "分析苹果公司最近的财务数据"}
+        health_data, logs_data, chat_response = await asyncio.gather(
+            _fetch_json(session, "GET", f"{base_url}/api/health"),
+            _fetch_json(session, "GET", f"{base_url}/api/debug/logs"),
+            _fetch_json(session, "POST", f"{base_url}/api/chat", json=chat_data),
+            return_exceptions=True
+        )
+
+        if isinstance(health_data, Exception):
+            print("健康检查失败:", health_data)
             return
-        
-        # 测试获取调试日志
-        try:
-            async with session.get(f"{base_url}/api/debug/logs") as resp:
-                logs_data = await resp.json()
-                print("调试日志:", logs_data)
-        except Exception as e:
-            print("获取调试日志失败:", e)
-        
-        # 测试发送聊天消息
-        try:
-            chat_data = {"message": "分析苹果公司最近的财务数据"}
-            async with session.post(f"{base_url}/api/chat", json=chat_data) as resp:
-                chat_response = await resp.json()
-                print("聊天响应:", chat_response)
-        except Exception as e:
-            print("发送聊天消息失败:", e)
-        
-        # 再次获取调试日志，查看是否有新增日志
+        print("健康检查:", health_data)
+
+        if isinstance(logs_data, Exception):
+            print("获取调试日志失败:", logs_data)
+        else:
+            print("调试日志:", logs_data)
+
+        if isinstance(chat_response, Exception):
+            print("发送聊天消息失败:", chat_response)
+        else:
+            print("聊天响应:", chat_response)
+
+        # 聊天完成后再次获取全部调试日志，查看是否有新增日志
         try:
-            async with session.get(f"{base_url}/api/debug/logs") as resp:
-                logs_data = await resp.json()
-                print("更新后的调试日志数量:", len(logs_data.get("logs", [])))
+            logs_data = await _fetch_json(session, "GET", f"{base_url}/api/debug/logs?limit=0")
+            print("更新后的调试日志数量:", len(logs_data.get("logs", [])))
         except Exception as e:
             print("获取更新后的调试日志失败:", e)
 
 if __name__ == "__main__":
-    asyncio.run(test_debug_api())
\ No newline at end of file
+    asyncio.run(test_debug_api())